@@ -0,0 +1,88 @@
+"""
+Compare the duration and memory peak of ``collection_diff`` with the previous
+implementation, on generated collections.
+
+    PYTHONPATH=. uv run python bin/benchmark-collection-diff.py --records 100000 --changes 10
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from checks.remotesettings.utils import collection_diff
+
+
+def legacy_records_equal(a, b):
+    ignore_fields = ("last_modified", "schema")
+    ac = {k: v for k, v in a.items() if k not in ignore_fields}
+    bc = {k: v for k, v in b.items() if k not in ignore_fields}
+    return ac == bc
+
+
+def legacy_collection_diff(src, dest):
+    dest_by_id = {r["id"]: r for r in dest}
+    to_create = []
+    to_update = []
+    for r in src:
+        record = dest_by_id.pop(r["id"], None)
+        if record is None:
+            to_create.append(r)
+        elif not legacy_records_equal(r, record):
+            r = {k: v for k, v in r.items() if k != "last_modified"}
+            to_update.append((record, r))
+    to_delete = list(dest_by_id.values())
+    return to_create, to_update, to_delete
+
+
+def generate(records, changes):
+    src = [
+        {
+            "id": f"record-{i:08d}",
+            "last_modified": i,
+            "schema": 42,
+            "details": {"name": f"Record {i}", "tags": ["a", "b", "c"]},
+            "enabled": i % 2 == 0,
+        }
+        for i in range(records)
+    ]
+    dest = [{**r, "last_modified": r["last_modified"] + 1} for r in src]
+    for r in random.sample(dest, changes):
+        r["details"] = {**r["details"], "name": "Changed"}
+    random.shuffle(dest)
+    return src, dest
+
+
+def measure(func, src, dest):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func(src, dest)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument("--changes", type=int, default=10)
+    args = parser.parse_args()
+
+    src, dest = generate(args.records, args.changes)
+    results = {}
+    for name, func in [
+        ("legacy", legacy_collection_diff),
+        ("current", collection_diff),
+    ]:
+        result, elapsed, peak = measure(func, src, dest)
+        results[name] = result
+        print(f"{name:>8}: {elapsed:.3f}s, peak {peak / 1024 / 1024:.1f}MiB")
+
+    _, legacy_updated, _ = results["legacy"]
+    _, updated, _ = results["current"]
+    assert len(legacy_updated) == len(updated) == args.changes
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@
 Every attachment in every collection should be avaailable.
 
 The URLs of unreachable attachments is returned along with the number of checked records.
+
+When the work queue is enabled, the URLs are checked in batches by all replicas.
 """
 
 import math
@@ -9,9 +11,9 @@ import math
 import aiohttp
 
 from telescope.typings import CheckResult
-from telescope.utils import fetch_head, run_parallel
+from telescope.utils import WORK_QUEUE, fetch_head, run_parallel
 
-from .utils import KintoClient
+from .utils import KintoClient, fetch_server_info
 
 
 async def test_url(url):
@@ -22,10 +24,15 @@ async def test_url(url):
         return False
 
 
+@WORK_QUEUE.task
+async def check_urls(urls):
+    return await run_parallel(*(test_url(url) for url in urls))
+
+
 async def run(server: str, slice_percent: tuple[int, int] = (0, 100)) -> CheckResult:
     client = KintoClient(server_url=server)
 
-    info = await client.server_info()
+    info = await fetch_server_info(server)
     base_url = info["capabilities"]["attachments"]["base_url"]
 
     # Fetch collections records in parallel.
@@ -55,8 +62,8 @@ async def run(server: str, slice_percent: tuple[int, int] = (0, 100)) -> CheckRe
     upper_idx = math.ceil(slice_percent[1] / 100.0 * len(urls))
     sliced = urls[lower_idx:upper_idx]
 
-    futures = [test_url(url) for url in sliced]
-    results = await run_parallel(*futures)
+    # URLs can be checked by other replicas (see ``WORK_QUEUE_ENABLED``).
+    results = await WORK_QUEUE.map(check_urls, sliced)
     missing = [url for url, success in zip(sliced, results) if not success]
 
     return len(missing) == 0, {
@@ -2,12 +2,15 @@
 Verify freshness and validity of attachment bundles.
 
 For each collection where the attachments bundle is enable, return the modification timestamp and number of attachments bundled.
+
+Only the central directory of the bundles is downloaded, using HTTP range requests when the server supports them.
 """
 
 import io
 import logging
+import struct
 import zipfile
-from typing import Any
+from typing import Any, Dict, Optional, Tuple
 
 from telescope.typings import CheckResult
 from telescope.utils import (
@@ -17,7 +20,7 @@ from telescope.utils import (
     utcfromtimestamp,
 )
 
-from .utils import KintoClient, fetch_signed_resources
+from .utils import KintoClient, fetch_server_info, fetch_signed_resources
 
 
 EXPOSED_PARAMETERS = ["server"]
@@ -25,6 +28,107 @@ EXPOSED_PARAMETERS = ["server"]
 logger = logging.getLogger(__name__)
 
 
+# End of central directory record, followed by a comment of up to 64KiB.
+EOCD_SIGNATURE = b"PK\x05\x06"
+EOCD_STRUCT = struct.Struct("<4s4H2LH")
+EOCD_MAX_SIZE = EOCD_STRUCT.size + 0xFFFF
+
+
+class SuffixFile(io.RawIOBase):
+    """
+    Read-only file of ``size`` bytes, of which only the last ones are known.
+    The unknown content reads as zeros.
+    """
+
+    def __init__(self, size: int, suffix: bytes):
+        self.size = size
+        self.suffix = suffix
+        self.start = size - len(suffix)
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: self.size}
+        self.position = max(0, base[whence] + offset)
+        return self.position
+
+    def tell(self):
+        return self.position
+
+    def readinto(self, b):
+        end = min(self.position + len(b), self.size)
+        if end <= self.position:
+            return 0
+        zeros = max(0, min(end, self.start) - self.position)
+        known = self.suffix[max(0, self.position - self.start) : end - self.start]
+        n = zeros + len(known)
+        b[:n] = b"\x00" * zeros + known
+        self.position = end
+        return n
+
+
+def central_directory_offset(tail: bytes) -> Optional[int]:
+    """
+    Return the offset of the central directory, from the end of a ZIP file.
+    """
+    idx = tail.rfind(EOCD_SIGNATURE)
+    if idx < 0 or len(tail) - idx < EOCD_STRUCT.size:
+        return None
+    *_, offset, _ = EOCD_STRUCT.unpack_from(tail, idx)
+    if offset == 0xFFFFFFFF:
+        # ZIP64 archive.
+        return None
+    return offset
+
+
+def count_entries(fileobj) -> Optional[int]:
+    try:
+        return len(zipfile.ZipFile(fileobj).namelist())
+    except zipfile.BadZipFile:
+        return None
+
+
+async def fetch_central_directory(url: str, size: int, tail: bytes) -> Optional[bytes]:
+    """
+    Return the end of the ZIP file starting at its central directory, or ``None``
+    if it cannot be located with range requests.
+    """
+    offset = central_directory_offset(tail)
+    if offset is None:
+        return None
+    tail_start = size - len(tail)
+    if offset >= tail_start:
+        return tail
+    # The central directory does not fit in the tail.
+    status, _, head = await fetch_raw(
+        url, headers={"Range": f"bytes={offset}-{tail_start - 1}"}
+    )
+    return head + tail if status == 206 else None
+
+
+async def fetch_bundle(url: str) -> Tuple[int, Dict[str, str], int, Optional[int]]:
+    """
+    Return the HTTP status, headers, size and number of entries of the bundle.
+    """
+    status, headers, body = await fetch_raw(
+        url, headers={"Range": f"bytes=-{EOCD_MAX_SIZE}"}
+    )
+    if status == 206:
+        size = int(headers["Content-Range"].rsplit("/", 1)[-1])
+        suffix = await fetch_central_directory(url, size, body)
+        if suffix is not None:
+            return status, headers, size, count_entries(SuffixFile(size, suffix))
+    if status in (206, 416):
+        # Unsupported archive, or range not satisfiable (eg. empty file).
+        status, headers, body = await fetch_raw(url)
+    return status, headers, len(body), count_entries(io.BytesIO(body))
+
+
 async def run(
     server: str, auth: str, margin_publication_hours: int = 12
 ) -> CheckResult:
@@ -53,7 +157,7 @@ async def run(
         resource["last_modified"] for resource, _ in metadata_for_bundled
     ]
 
-    info = await client.server_info()
+    info = await fetch_server_info(server, auth)
     base_url = info["capabilities"]["attachments"]["base_url"]
 
     futures_bundles = []
@@ -61,7 +165,7 @@ async def run(
         bid = resource["destination"]["bucket"]
         cid = metadata["data"]["id"]
         url = f"{base_url}bundles/{bid}--{cid}.zip"
-        futures_bundles.append(fetch_raw(url))
+        futures_bundles.append(fetch_bundle(url))
     bundles = await run_parallel(*futures_bundles)
 
     timestamps_metadata_bundles = zip(records_timestamps, metadata_for_bundled, bundles)
@@ -69,7 +173,7 @@ async def run(
     result: dict[str, dict[str, Any]] = {}
     success = True
     for timestamp, (resource, metadata), bundle in timestamps_metadata_bundles:
-        http_status, headers, binary = bundle
+        http_status, headers, size, nfiles = bundle
         modified = headers.get("Last-Modified", "Mon, 01 Jan 1970 00:00:00 GMT")
         bid = resource["destination"]["bucket"]
         cid = metadata["data"]["id"]
@@ -83,10 +187,7 @@ async def run(
                 result[f"{bid}/{cid}"] = {"status": "no records"}
             continue
 
-        try:
-            z = zipfile.ZipFile(io.BytesIO(binary))
-            nfiles = len(z.namelist())
-        except zipfile.BadZipFile:
+        if nfiles is None:
             result[f"{bid}/{cid}"] = {"status": "bad zip"}
             success = False
             continue
@@ -101,7 +202,7 @@ async def run(
         )
         result[f"{bid}/{cid}"] = {
             "status": status,
-            "size": len(binary),
+            "size": size,
             "attachments": nfiles,
             "publication_timestamp": bundle_ts.isoformat(),
             "collection_timestamp": records_ts.isoformat(),
@@ -1,55 +1,153 @@
 """
 Every attachment in every collection has the right size and hash.
 
-The URLs of invalid attachments is returned along with the number of checked records.
+The URLs of invalid attachments is returned along with the number of records with
+attachments (``total``), and the number of distinct attachments, checked and skipped.
+Attachments shared by several records are checked once.
+
+If an index path is specified, attachments verified recently are not downloaded again.
+
+When the work queue is enabled, the attachments are checked in batches by all replicas.
 """
 
 import asyncio
 import logging
+import random
+import sqlite3
+import time
+from typing import Iterable, Set, Tuple
 
 import aiohttp
 
 from telescope.typings import CheckResult
-from telescope.utils import (
-    fetch_raw,
-    limit_request_concurrency,
-    run_in_process_pool,
-    run_parallel,
-    sha256hex,
-)
+from telescope.utils import WORK_QUEUE, fetch_sha256, run_parallel
 
-from .utils import KintoClient
+from .utils import KintoClient, fetch_server_info
 
 
 logger = logging.getLogger(__name__)
 
 
-@limit_request_concurrency
+# Verifications expire after a random fraction of the index max age, between
+# this ratio and 1, so that attachments are not all downloaded again at once.
+INDEX_MIN_EXPIRY_RATIO = 0.5
+
+
+class VerifiedAttachmentsIndex:
+    """
+    On-disk index of the attachments whose size and hash were verified.
+
+    SQLite calls are blocking, and are run in the default executor.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _execute(self, func):
+        conn = sqlite3.connect(self.path)
+        try:
+            with conn:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS verified_attachments (
+                        location TEXT NOT NULL,
+                        hash TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        verified_at REAL NOT NULL,
+                        expiry_ratio REAL NOT NULL,
+                        PRIMARY KEY (location, hash, size)
+                    )
+                    """
+                )
+                return func(conn)
+        finally:
+            conn.close()
+
+    async def _run(self, func):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._execute, func)
+
+    async def verified(self, now: float, max_age: float) -> Set[Tuple[str, str, int]]:
+        """
+        Return the ``(location, hash, size)`` of attachments whose verification
+        has not expired yet.
+        """
+        rows = await self._run(
+            lambda conn: conn.execute(
+                "SELECT location, hash, size FROM verified_attachments"
+                " WHERE verified_at >= ? - ? * expiry_ratio",
+                (now, max_age),
+            ).fetchall()
+        )
+        return set(rows)
+
+    async def add(self, attachments: Iterable[Tuple[str, str, int]], timestamp: float):
+        rows = [
+            (*attachment, timestamp, random.uniform(INDEX_MIN_EXPIRY_RATIO, 1))
+            for attachment in attachments
+        ]
+        await self._run(
+            lambda conn: conn.executemany(
+                "INSERT OR REPLACE INTO verified_attachments"
+                " (location, hash, size, verified_at, expiry_ratio)"
+                " VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+        )
+
+    async def prune(self, before: float):
+        """
+        Delete the attachments verified before the specified timestamp.
+        """
+        await self._run(
+            lambda conn: conn.execute(
+                "DELETE FROM verified_attachments WHERE verified_at < ?", (before,)
+            )
+        )
+
+
 async def test_attachment(attachment):
     url = attachment["location"]
+    az = attachment["size"]
     try:
         logger.debug(f"Fetch attachment from '{url}'")
-        _, _, binary = await fetch_raw(url)
+        # Stop downloading as soon as the attachment is bigger than expected.
+        bz, bh = await fetch_sha256(url, max_size=az)
     except asyncio.TimeoutError:  # pragma: no cover
         return {"url": url, "error": "timeout"}, False
     except aiohttp.ClientError as exc:
         return {"url": url, "error": str(exc)}, False
 
-    if (bz := len(binary)) != (az := attachment["size"]):
+    if bh is None:
+        return {"url": url, "error": f"size differ (>{az})"}, False
+
+    if bz != az:
         return {"url": url, "error": f"size differ ({bz}!={az})"}, False
 
-    if (bh := await run_in_process_pool(sha256hex, binary)) != (
-        ah := attachment["hash"]
-    ):
+    if bh != (ah := attachment["hash"]):
         return {"url": url, "error": f"hash differ ({bh}!={ah})"}, False
 
     return {}, True
 
 
-async def run(server: str, slice_percent: tuple[int, int] = (0, 100)) -> CheckResult:
+@WORK_QUEUE.task
+async def check_attachments(attachments):
+    return await run_parallel(*(test_attachment(a) for a in attachments))
+
+
+def _index_key(attachment) -> Tuple[str, str, int]:
+    return attachment["location"], attachment.get("hash", ""), attachment["size"]
+
+
+async def run(
+    server: str,
+    slice_percent: tuple[int, int] = (0, 100),
+    index_path: str = "",
+    index_max_age_hours: int = 24,
+) -> CheckResult:
     client = KintoClient(server_url=server)
 
-    info = await client.server_info()
+    info = await fetch_server_info(server)
     base_url = info["capabilities"]["attachments"]["base_url"]
 
     # Fetch collections records in parallel.
@@ -66,17 +164,23 @@ async def run(server: str, slice_percent: tuple[int, int] = (0, 100)) -> CheckRe
     results = await run_parallel(*futures)
 
     # For each record that has an attachment, check the attachment content.
-    attachments = []
-    total_size = 0
+    # Attachments shared by several records are checked once.
+    attachments_by_key = {}
+    total_records = 0
     for changeset in results:
         records = changeset["changes"]
         for record in records:
             if "attachment" not in record:
                 continue
-            attachment = record["attachment"]
-            attachment["location"] = base_url + attachment["location"]
-            attachments.append(attachment)
-            total_size += attachment["size"]
+            total_records += 1
+            # Changesets are shared with other checks, leave them untouched.
+            attachment = {
+                **record["attachment"],
+                "location": base_url + record["attachment"]["location"],
+            }
+            attachments_by_key.setdefault(_index_key(attachment), attachment)
+    attachments = list(attachments_by_key.values())
+    total_size = sum(attachment["size"] for attachment in attachments)
 
     # Spread the load of attachments integrity check based on size.
     # Otherwise some slices may take much longer to complete than others.
@@ -107,11 +211,36 @@ async def run(server: str, slice_percent: tuple[int, int] = (0, 100)) -> CheckRe
     print(f"Attachments slice indexes: {lower_idx}-{upper_idx} of {len(attachments)}")
     sliced = attachments[lower_idx:upper_idx]
 
-    futures = [test_attachment(attachment) for attachment in sliced]
-    results = await run_parallel(*futures)
+    index = VerifiedAttachmentsIndex(index_path) if index_path else None
+    skipped = 0
+    if index is not None:
+        now = time.time()
+        max_age = index_max_age_hours * 3600
+        # Forget about replaced attachments.
+        await index.prune(before=now - max_age)
+        verified = await index.verified(now, max_age)
+        to_check = [a for a in sliced if _index_key(a) not in verified]
+        skipped = len(sliced) - len(to_check)
+        sliced = to_check
+
+    # Attachments can be checked by other replicas (see ``WORK_QUEUE_ENABLED``).
+    results = await WORK_QUEUE.map(check_attachments, sliced)
     bad = [result for result, success in results if not success]
+
+    if index is not None:
+        await index.add(
+            (
+                _index_key(attachment)
+                for attachment, (_, success) in zip(sliced, results)
+                if success
+            ),
+            timestamp=time.time(),
+        )
+
     return len(bad) == 0, {
         "bad": bad,
         "checked": len(sliced),
-        "total": len(attachments),
+        "skipped": skipped,
+        "attachments": len(attachments),
+        "total": total_records,
     }
@@ -3,9 +3,12 @@ Source, preview and/or final collections should have consistent records and stat
 
 If this check fails, this is very likely to be a software issue. Some insights about
 the consistencies are returned for each concerned collection.
+
+Collections found consistent are not compared again until their timestamps change.
 """
 
 import logging
+from typing import Dict, Optional, Tuple
 
 from telescope.typings import CheckResult
 from telescope.utils import run_parallel
@@ -26,6 +29,23 @@ EXPOSED_PARAMETERS = ["server"]
 logger = logging.getLogger(__name__)
 
 
+# Collections found consistent, by server and source collection.
+# Any change of the source records resets the source collection status, hence
+# its metadata timestamp, so these timestamps are enough to detect changes.
+consistent_states: Dict[Tuple[str, str, str], Tuple] = {}
+
+
+def collection_state(resource, source_metadata) -> Optional[Tuple]:
+    if "last_modified" not in resource:
+        return None
+    return (
+        source_metadata.get("status"),
+        source_metadata.get("last_modified"),
+        resource.get("preview_last_modified"),
+        resource["last_modified"],
+    )
+
+
 async def has_inconsistencies(server_url, auth, resource):
     source = resource["source"]
 
@@ -36,6 +56,22 @@ async def has_inconsistencies(server_url, auth, resource):
     )
     source_metadata = collection["data"]
 
+    key = (server_url, source["bucket"], source["collection"])
+    state = collection_state(resource, source_metadata)
+    if state is not None and consistent_states.get(key) == state:
+        # Nothing changed since the collections were found consistent.
+        return None
+    consistent_states.pop(key, None)
+
+    error = await compare_collections(client, resource, source_metadata)
+    if error is None and state is not None:
+        consistent_states[key] = state
+    return error
+
+
+async def compare_collections(client, resource, source_metadata):
+    source = resource["source"]
+
     try:
         status = source_metadata["status"]
     except KeyError:
@@ -51,8 +87,10 @@ async def has_inconsistencies(server_url, auth, resource):
                 **resource["source"]
             )
 
-        source_records = await client.get_records(**source)
-        preview_records = await client.get_records(**resource["preview"])
+        source_records, preview_records = await run_parallel(
+            client.get_records(**source),
+            client.get_records(**resource["preview"]),
+        )
 
         to_create, to_update, to_delete = collection_diff(
             source_records, preview_records
@@ -66,9 +104,11 @@ async def has_inconsistencies(server_url, auth, resource):
     # all be the same as those in the destination.
     elif status == "signed" or status is None:
         if "preview" in resource:
-            source_records = await client.get_records(**source)
-            dest_records = await client.get_records(**resource["destination"])
-            preview_records = await client.get_records(**resource["preview"])
+            source_records, dest_records, preview_records = await run_parallel(
+                client.get_records(**source),
+                client.get_records(**resource["destination"]),
+                client.get_records(**resource["preview"]),
+            )
 
             to_create, to_update, to_delete = collection_diff(
                 preview_records, dest_records
@@ -86,8 +126,10 @@ async def has_inconsistencies(server_url, auth, resource):
                     "source", "preview", to_create, to_update, to_delete
                 )
         else:
-            source_records = await client.get_records(**source)
-            dest_records = await client.get_records(**resource["destination"])
+            source_records, dest_records = await run_parallel(
+                client.get_records(**source),
+                client.get_records(**resource["destination"]),
+            )
             # Otherwise, just compare source/dest
             to_create, to_update, to_delete = collection_diff(
                 source_records, dest_records
@@ -5,6 +5,7 @@ For each collection, the list of latest approvals is returned. The date, author
 number of applied changes are provided.
 """
 
+from bisect import bisect_left
 from collections import Counter
 from datetime import timedelta
 
@@ -60,42 +61,50 @@ async def get_latest_approvals(
             "_since": min_timestamp,
             "_limit": max_approvals + 1,
         },
+        max_objects=max_approvals + 1,
     )
     # Now fetch the number of changes for each approval.
+    if not history:
+        return []
 
     # If there was only one approval, add a fake previous.
     if len(history) == 1:
         history.append({"last_modified": 0})
 
-    # For each pair (previous, current) fetch the number of history entries
-    # on records.
-    results = []
-    for i, current in enumerate(history[:-1]):
-        previous = history[i + 1]
-        after = previous["last_modified"]
-        before = current["last_modified"]
-
-        # We are interested in the number of history entries between two approvals. The
-        # approval timestamps are part of the history object data (ie. `target` field)
-        # and are not indexed on the server. In order to reduce the cost of the request,
-        # we will prefilter the history entries by their own timestamp,
-        # assuming the history entries were created within 1sec after the target object
-        # modification (usually it's a few milliseconds).
-        changes = await client.get_history(
-            bucket=bucket,
-            params={
-                "resource_name": "record",
-                "collection_id": collection,
-                "_since": after,
-                "_before": before + 1000,
-                "gt_target.data.last_modified": after,
-                "lt_target.data.last_modified": before,
-            },
-        )
-        by_action = Counter()
-        for change in changes:
-            by_action[change["action"]] += 1
+    # Approval timestamps in ascending order, the changes of each approval
+    # were made between its own timestamp and the previous one.
+    boundaries = [entry["last_modified"] for entry in reversed(history)]
+    after = boundaries[0]
+    before = boundaries[-1]
+
+    # We are interested in the number of history entries between two approvals. The
+    # approval timestamps are part of the history object data (ie. `target` field)
+    # and are not indexed on the server. In order to reduce the cost of the request,
+    # we will prefilter the history entries by their own timestamp,
+    # assuming the history entries were created within 1sec after the target object
+    # modification (usually it's a few milliseconds).
+    # The whole period is fetched at once, and the entries are then counted
+    # for each pair (previous, current) of approvals.
+    changes = client.iter_history(
+        bucket=bucket,
+        params={
+            "resource_name": "record",
+            "collection_id": collection,
+            "_since": after,
+            "_before": before + 1000,
+            "gt_target.data.last_modified": after,
+            "lt_target.data.last_modified": before,
+        },
+    )
+    by_approval = [Counter() for _ in boundaries[1:]]
+    async for change in changes:
+        timestamp = change["target"]["data"]["last_modified"]
+        i = bisect_left(boundaries, timestamp)
+        if 0 < i < len(boundaries) and timestamp != boundaries[i]:
+            by_approval[i - 1][change["action"]] += 1
 
+    results = []
+    for current, by_action in zip(history[:-1], reversed(by_approval)):
         results.append(
             {
                 "timestamp": current["last_modified"],
@@ -19,7 +19,10 @@ DEFAULT_PLOT = "0.totals"
 
 
 async def get_approvals(client, bucket, min_timestamp, max_timestamp):
-    changes = await client.get_history(
+    """
+    Return the number of approvals per day and collection for the specified bucket.
+    """
+    changes = client.iter_history(
         bucket=bucket,
         params={
             "resource_name": "collection",
@@ -29,47 +32,52 @@ async def get_approvals(client, bucket, min_timestamp, max_timestamp):
             "_before": max_timestamp,
         },
     )
-    by_collection = Counter(change["collection_id"] for change in changes)
-    return by_collection
+    by_day_collection = Counter()
+    async for change in changes:
+        date = utcfromtimestamp(change["last_modified"]).date().isoformat()
+        by_day_collection[(date, change["collection_id"])] += 1
+    return by_day_collection
 
 
 async def run(server: str, auth: str, period_days: int = 3) -> CheckResult:
-    # Compute the list of timestamps couples of the past full days,
-    # starting from today at midnight (last night).
+    # Compute the boundaries of the past full days, starting from
+    # today at midnight (last night).
     today_00h00_timestamp = (
         datetime.combine(utcnow(), datetime.min.time(), tzinfo=timezone.utc).timestamp()
         * 1000
     )
-    days_min_max = []
-    for iday in range(period_days):
-        iday_00h00_timestamp = today_00h00_timestamp - (iday + 1) * ONE_DAY_MSEC
-        iday_23h59_timestamp = today_00h00_timestamp - iday * ONE_DAY_MSEC
-        days_min_max.append((iday_00h00_timestamp, iday_23h59_timestamp))
+    min_timestamp = today_00h00_timestamp - period_days * ONE_DAY_MSEC
 
     # Get the list of bucket names used as source (eg. main-workspace, ...)
     resources = await fetch_signed_resources(server, auth)
     source_buckets = {r["source"]["bucket"] for r in resources}
 
-    # Prepare an array with information about each of the last days.
+    # Approvals for each bucket over the whole period.
     client = KintoClient(server_url=server, auth=auth)
+    futures = [
+        get_approvals(client, bucket, min_timestamp, today_00h00_timestamp)
+        for bucket in source_buckets
+    ]
+    results = await run_parallel(*futures)
+
+    # Prepare an array with information about each of the last days.
     days = []
-    for min_day, max_day in days_min_max:
+    by_date = {}
+    for iday in range(period_days):
+        iday_00h00_timestamp = today_00h00_timestamp - (iday + 1) * ONE_DAY_MSEC
         day = {
-            "date": utcfromtimestamp(min_day).date().isoformat(),
+            "date": utcfromtimestamp(iday_00h00_timestamp).date().isoformat(),
             "totals": 0,
         }
-        # Approvals for each bucket on this day.
-        futures = [
-            get_approvals(client, bucket, min_day, max_day) for bucket in source_buckets
-        ]
-        results = await run_parallel(*futures)
-        approvals_per_bucket = zip(source_buckets, results)
-        # Sum the totals and show counters per collection on each day
-        for bucket, counter in approvals_per_bucket:
-            for cid, total in counter.items():
-                day[f"{bucket}/{cid}"] = total
-                day["totals"] += total
         days.append(day)
+        by_date[day["date"]] = day
+
+    # Sum the totals and show counters per collection on each day
+    for bucket, counter in zip(source_buckets, results):
+        for (date, cid), total in counter.items():
+            day = by_date[date]
+            day[f"{bucket}/{cid}"] = total
+            day["totals"] += total
 
     # [
     #   {
@@ -1,12 +1,108 @@
+import asyncio
 import base64
 import copy
 import random
 import re
-from typing import Any, Dict, List
+from typing import (
+    Any,
+    AsyncGenerator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
 
 from telescope import utils
 
 
+def apply_changes(changeset: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return the changeset obtained by applying the changes (and tombstones) of
+    ``delta`` on the records of ``changeset``.
+
+    >>> apply_changes(
+    ...     {"timestamp": 2, "changes": [{"id": "a", "last_modified": 2}, {"id": "b", "last_modified": 1}]},
+    ...     {"timestamp": 4, "changes": [{"id": "c", "last_modified": 4}, {"id": "a", "last_modified": 3, "deleted": True}]},
+    ... )
+    {'timestamp': 4, 'changes': [{'id': 'c', 'last_modified': 4}, {'id': 'b', 'last_modified': 1}]}
+    """
+    records = {r["id"]: r for r in changeset["changes"]}
+    for change in delta["changes"]:
+        if change.get("deleted"):
+            records.pop(change["id"], None)
+        else:
+            records[change["id"]] = change
+    # Same order as full changesets.
+    changes = sorted(records.values(), key=lambda r: r["last_modified"], reverse=True)
+    return {**delta, "changes": changes}
+
+
+class ChangesetStore:
+    """
+    Process-wide mirror of downloaded changesets, shared by all checks.
+
+    Only the latest version of each collection is kept, and concurrent downloads
+    of the same version are coalesced. When a newer version is requested, only
+    the changes since the kept version are downloaded if possible.
+    Stored changesets must not be mutated.
+    """
+
+    def __init__(self):
+        self._changesets: Dict[Tuple, Tuple[str, Dict[str, Any]]] = {}
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+
+    def clear(self):
+        self._changesets.clear()
+        self._inflight.clear()
+
+    async def get(
+        self,
+        key: Tuple,
+        expected: Any,
+        fetch: Callable[[], Awaitable[Dict[str, Any]]],
+        fetch_since: Optional[Callable[[int], Awaitable[Dict[str, Any]]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Return the changeset of the collection identified by ``key`` at the
+        ``expected`` timestamp, downloading it with ``fetch`` if missing, or
+        the changes since the kept version with ``fetch_since``.
+        """
+        expected = str(expected)
+        stored = self._changesets.get(key)
+        if stored is not None and stored[0] == expected:
+            return stored[1]
+
+        async def download():
+            if stored is not None and fetch_since is not None:
+                previous = stored[1]
+                if expected.isdigit() and previous["timestamp"] < int(expected):
+                    delta = await fetch_since(previous["timestamp"])
+                    return apply_changes(previous, delta)
+            return await fetch()
+
+        inflight_key = (*key, expected)
+        if (future := self._inflight.get(inflight_key)) is None:
+            future = asyncio.ensure_future(download())
+            self._inflight[inflight_key] = future
+
+            def done(future):
+                del self._inflight[inflight_key]
+                if future.cancelled() or future.exception() is not None:
+                    return
+                changeset = future.result()
+                # Only store the requested version (eg. not stale CDN responses).
+                if str(changeset.get("timestamp")) == expected:
+                    self._changesets[key] = expected, changeset
+
+            future.add_done_callback(done)
+        return await asyncio.shield(future)
+
+
+changesets_store = ChangesetStore()
+
+
 class KintoClient:
     def __init__(self, *, server_url: str, auth: str = ""):
         self.server_url = server_url
@@ -32,15 +128,60 @@ class KintoClient:
         url = f"{self.server_url}/buckets/{bucket}/collections/{id}"
         return await utils.fetch_json(url, **self._client_kwargs(**kwargs))
 
-    async def get_collections(self, *, bucket: str, **kwargs) -> Dict:
+    async def _paginate(
+        self, url: str, max_objects: Optional[int] = None, **kwargs
+    ) -> AsyncGenerator[Dict, None]:
+        """
+        Iterate over the objects of a paginated list, following the ``Next-Page``
+        links, and stop after ``max_objects`` if specified. The next page is
+        fetched while the current one is consumed.
+        """
+        kwargs = self._client_kwargs(**kwargs)
+        page: Optional[asyncio.Future] = asyncio.ensure_future(
+            utils.fetch_json_page(url, **kwargs)
+        )
+        # Next page URLs contain the querystring already.
+        kwargs.pop("params", None)
+        remaining = max_objects
+        try:
+            while page is not None:
+                body, next_page = await page
+                objects = body["data"][:remaining]
+                if remaining is not None:
+                    remaining -= len(objects)
+                page = (
+                    asyncio.ensure_future(utils.fetch_json_page(next_page, **kwargs))
+                    if next_page and remaining != 0
+                    else None
+                )
+                for obj in objects:
+                    yield obj
+        finally:
+            if page is not None:
+                page.cancel()
+
+    def iter_collections(self, *, bucket: str, **kwargs) -> AsyncGenerator[Dict, None]:
         url = f"{self.server_url}/buckets/{bucket}/collections"
-        return (await utils.fetch_json(url, **self._client_kwargs(**kwargs)))["data"]
+        return self._paginate(url, **kwargs)
+
+    async def get_collections(self, *, bucket: str, **kwargs) -> List[Dict]:
+        return [c async for c in self.iter_collections(bucket=bucket, **kwargs)]
+
+    def iter_records(
+        self, *, bucket: str, collection: str, **kwargs
+    ) -> AsyncGenerator[Dict, None]:
+        url = f"{self.server_url}/buckets/{bucket}/collections/{collection}/records"
+        return self._paginate(url, **kwargs)
 
     async def get_records(
         self, *, bucket: str, collection: str, **kwargs
     ) -> List[Dict]:
-        url = f"{self.server_url}/buckets/{bucket}/collections/{collection}/records"
-        return (await utils.fetch_json(url, **self._client_kwargs(**kwargs)))["data"]
+        return [
+            r
+            async for r in self.iter_records(
+                bucket=bucket, collection=collection, **kwargs
+            )
+        ]
 
     async def get_monitor_changes(self, **kwargs) -> List[Dict]:
         resp = await self.get_changeset(
@@ -51,11 +192,46 @@ class KintoClient:
     async def get_changeset(
         self, *, bucket: str, collection: str, bust_cache: bool = False, **kwargs
     ) -> Dict[str, Any]:
+        """
+        Fetch the changeset of the specified collection.
+
+        When a specific timestamp is ``_expected``, the changeset is shared with
+        the other checks of this process, and must not be mutated.
+        """
         url = f"{self.server_url}/buckets/{bucket}/collections/{collection}/changeset"
-        kwargs.setdefault("params", {}).setdefault(
+        params = kwargs.setdefault("params", {})
+        params.setdefault(
             "_expected", random.randint(999999000000, 999999999999) if bust_cache else 0
         )
-        return await utils.fetch_json(url, **self._client_kwargs(**kwargs))
+        if bust_cache:
+            # Don't keep these single-use responses in the HTTP cache.
+            kwargs["headers"] = {
+                **kwargs.get("headers", {}),
+                "Cache-Control": "no-store",
+            }
+
+        def fetch(**extra_params):
+            fetch_kwargs = {**kwargs, "params": {**params, **extra_params}}
+            return utils.fetch_json(url, **self._client_kwargs(**fetch_kwargs))
+
+        if bust_cache or params["_expected"] in (0, "0") or kwargs.keys() != {"params"}:
+            return await fetch()
+
+        other_params = tuple(
+            sorted((k, str(v)) for k, v in params.items() if k != "_expected")
+        )
+        key = (
+            self.server_url,
+            self.headers["Authorization"],
+            bucket,
+            collection,
+            other_params,
+        )
+        # Partial changesets cannot be updated incrementally.
+        fetch_since = None if other_params else lambda since: fetch(_since=since)
+        return await changesets_store.get(
+            key, params["_expected"], fetch, fetch_since=fetch_since
+        )
 
     async def get_record(
         self, *, bucket: str, collection: str, id: str, **kwargs
@@ -72,9 +248,12 @@ class KintoClient:
         _, headers = await utils.fetch_head(url, **self._client_kwargs(**kwargs))
         return headers["ETag"].strip('"')
 
-    async def get_history(self, *, bucket: str, **kwargs) -> List[Dict]:
+    def iter_history(self, *, bucket: str, **kwargs) -> AsyncGenerator[Dict, None]:
         url = f"{self.server_url}/buckets/{bucket}/history"
-        return (await utils.fetch_json(url, **self._client_kwargs(**kwargs)))["data"]
+        return self._paginate(url, **kwargs)
+
+    async def get_history(self, *, bucket: str, **kwargs) -> List[Dict]:
+        return [e async for e in self.iter_history(bucket=bucket, **kwargs)]
 
     async def get_group(self, *, bucket: str, id: str, **kwargs) -> Dict:
         url = f"{self.server_url}/buckets/{bucket}/groups/{id}"
@@ -112,9 +291,35 @@ class MissingFromMonitorChangesError(ValueError):
         self.collection = collection
 
 
+# Signed resources and server info by server and authorization, along with the
+# timestamp of monitor/changes when they were resolved.
+signed_resources_cache: Dict[Tuple[str, str], Tuple[Any, Dict, List[Dict]]] = {}
+
+
+async def fetch_server_info(server_url: str, auth: str = "") -> Dict:
+    """
+    Return the server info, from the signed resources cache if available.
+    """
+    client = KintoClient(server_url=server_url, auth=auth)
+    cached = signed_resources_cache.get((server_url, client.headers["Authorization"]))
+    if cached is not None:
+        return copy.deepcopy(cached[1])
+    return await client.server_info()
+
+
 async def fetch_signed_resources(server_url: str, auth: str) -> List[Dict[str, Dict]]:
-    # List signed collection using capabilities.
     client = KintoClient(server_url=server_url, auth=auth)
+    monitor = await client.get_changeset(
+        bucket="monitor", collection="changes", params={"_sort": "bucket,collection"}
+    )
+    # The resolved resources are reused until monitor/changes changes.
+    key = (server_url, client.headers["Authorization"])
+    timestamp = monitor.get("timestamp")
+    cached = signed_resources_cache.get(key)
+    if timestamp is not None and cached is not None and cached[0] == timestamp:
+        return copy.deepcopy(cached[2])
+
+    # List signed collection using capabilities.
     info = await client.server_info()
     try:
         resources = info["capabilities"]["signer"]["resources"]
@@ -157,7 +362,8 @@ async def fetch_signed_resources(server_url: str, auth: str) -> List[Dict[str, D
         all_source_collections.add((bid, cid))
 
     resources = []
-    monitored = await client.get_monitor_changes(params={"_sort": "bucket,collection"})
+    monitored = monitor["changes"]
+    timestamps = {(e["bucket"], e["collection"]): e["last_modified"] for e in monitored}
     for entry in monitored:
         bid = entry["bucket"]
         cid = entry["collection"]
@@ -181,6 +387,9 @@ async def fetch_signed_resources(server_url: str, auth: str) -> List[Dict[str, D
         )
 
         r["last_modified"] = entry["last_modified"]
+        if "preview" in r:
+            preview = (r["preview"]["bucket"], r["preview"]["collection"])
+            r["preview_last_modified"] = timestamps.get(preview)
 
         resources.append(r)
 
@@ -188,23 +397,33 @@ async def fetch_signed_resources(server_url: str, auth: str) -> List[Dict[str, D
     for bid, cid in all_source_collections:
         raise MissingFromMonitorChangesError(bid, cid)
 
+    if timestamp is not None:
+        signed_resources_cache[key] = timestamp, info, copy.deepcopy(resources)
     return resources
 
 
+# Attributes assigned automatically by the server.
+IGNORED_RECORD_FIELDS = {"last_modified": None, "schema": None}
+
+
 def records_equal(a, b):
     """
     Compare records attributes, ignoring those assigned automatically
     by the server.
     """
-    ignore_fields = ("last_modified", "schema")
-    ac = {k: v for k, v in a.items() if k not in ignore_fields}
-    bc = {k: v for k, v in b.items() if k not in ignore_fields}
-    return ac == bc
+    # Overriding the ignored fields is much cheaper than filtering them out.
+    return {**a, **IGNORED_RECORD_FIELDS} == {**b, **IGNORED_RECORD_FIELDS}
 
 
 def collection_diff(src, dest):
     """
     Compare two lists of records.
+
+    >>> collection_diff(
+    ...     [{"id": "a", "last_modified": 2}, {"id": "b", "title": "new", "last_modified": 3}],
+    ...     [{"id": "b", "title": "old", "last_modified": 1}, {"id": "c", "last_modified": 1}],
+    ... )
+    ([{'id': 'a', 'last_modified': 2}], [({'id': 'b', 'title': 'old', 'last_modified': 1}, {'id': 'b', 'title': 'new'})], [{'id': 'c', 'last_modified': 1}])
     """
     dest_by_id = {r["id"]: r for r in dest}
     to_create = []
@@ -213,8 +432,9 @@ def collection_diff(src, dest):
         record = dest_by_id.pop(r["id"], None)
         if record is None:
             to_create.append(r)
-        elif not records_equal(r, record):
-            r.pop("last_modified", None)
+        elif r != record and not records_equal(r, record):
+            # Leave the compared records untouched.
+            r = {k: v for k, v in r.items() if k != "last_modified"}
             to_update.append((record, r))
     to_delete = list(dest_by_id.values())
     return to_create, to_update, to_delete
@@ -4,10 +4,11 @@ Signatures should be valid for each collection content.
 The errors are returned for each concerned collection.
 """
 
+import asyncio
 import logging
 import operator
 import time
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import canonicaljson
 from autograph_utils import (
@@ -19,7 +20,13 @@ from autograph_utils import (
 )
 
 from telescope.typings import CheckResult
-from telescope.utils import ClientSession, retry_decorator, run_parallel
+from telescope.utils import (
+    WORK_QUEUE,
+    ClientSession,
+    retry_decorator,
+    run_in_process_pool,
+    run_parallel,
+)
 
 from .utils import KintoClient
 
@@ -27,18 +34,26 @@ from .utils import KintoClient
 logger = logging.getLogger(__name__)
 
 
-@retry_decorator
-async def validate_signature(verifier, metadata, records, timestamp):
-    signatures = metadata.get("signatures")
-    assert signatures is not None and len(signatures) > 0, "Missing signature"
-
-    data = canonicaljson.dumps(  # ty: ignore[unresolved-attribute]
+def canonical_payload(records, timestamp) -> bytes:
+    """
+    Serialize the collection content as it was signed.
+    """
+    return canonicaljson.dumps(  # ty: ignore[unresolved-attribute]
         {
             "data": sorted(records, key=operator.itemgetter("id")),
             "last_modified": str(timestamp),
         }
     ).encode("utf-8")
 
+
+@retry_decorator
+async def validate_signature(verifier, metadata, records, timestamp):
+    signatures = metadata.get("signatures")
+    assert signatures is not None and len(signatures) > 0, "Missing signature"
+
+    # Serializing big collections would block the event loop for a while.
+    data = await run_in_process_pool(canonical_payload, records, timestamp)
+
     thrown_error = None
     for signature in signatures:
         x5u = signature["x5u"]
@@ -52,18 +67,20 @@ async def validate_signature(verifier, metadata, records, timestamp):
     raise thrown_error
 
 
-async def run(
-    server: str, buckets: List[str], root_hash: Optional[str] = None
-) -> CheckResult:
+@WORK_QUEUE.task
+async def verify_collections(
+    entries: List[Dict],
+    server: str,
+    root_hash: Optional[str] = None,
+    max_concurrent_verifications: int = 4,
+) -> List[Tuple[str, Optional[str]]]:
+    """
+    Verify the signatures of a batch of collections, and return their errors.
+    """
     root_hash_bytes: Optional[bytes] = (
         decode_mozilla_hash(root_hash) if root_hash else None
     )
     client = KintoClient(server_url=server)
-    entries = [
-        entry
-        for entry in await client.get_monitor_changes()
-        if entry["bucket"] in buckets
-    ]
 
     # Fetch collections records in parallel.
     futures = [
@@ -80,31 +97,64 @@ async def run(
     logger.info(f"Downloaded all data in {elapsed_time:.2f}s")
 
     cache = MemoryCache()
+    semaphore = asyncio.Semaphore(max_concurrent_verifications)
 
     async with ClientSession() as session:
         verifier = SignatureVerifier(session, cache, root_hash=root_hash_bytes)
 
-        # Validate signatures sequentially.
-        errors = {}
-        for i, (entry, changeset) in enumerate(zip(entries, results)):
+        async def verify(i, entry, changeset):
             cid = "{bucket}/{collection}".format(**entry)
             message = "{:02d}/{:02d} {}: ".format(i + 1, len(entries), cid)
-            try:
-                start_time = time.time()
-                await validate_signature(
-                    verifier,
-                    changeset["metadata"],
-                    changeset["changes"],
-                    changeset["timestamp"],
-                )
-                elapsed_time = time.time() - start_time
-
-                message += f"OK ({elapsed_time:.2f}s)"
-                logger.info(message)
-
-            except (BadSignature, BadCertificate) as e:
-                message += "⚠ Signature Error ⚠ " + repr(e)
-                logger.error(message)
-                errors[cid] = repr(e)
+            async with semaphore:
+                try:
+                    start_time = time.time()
+                    await validate_signature(
+                        verifier,
+                        changeset["metadata"],
+                        changeset["changes"],
+                        changeset["timestamp"],
+                    )
+                    elapsed_time = time.time() - start_time
+
+                    message += f"OK ({elapsed_time:.2f}s)"
+                    logger.info(message)
+                    return cid, None
+
+                except (BadSignature, BadCertificate) as e:
+                    message += "⚠ Signature Error ⚠ " + repr(e)
+                    logger.error(message)
+                    return cid, repr(e)
+
+        # Validate signatures concurrently.
+        return await run_parallel(
+            *(
+                verify(i, entry, changeset)
+                for i, (entry, changeset) in enumerate(zip(entries, results))
+            )
+        )
+
+
+async def run(
+    server: str,
+    buckets: List[str],
+    root_hash: Optional[str] = None,
+    max_concurrent_verifications: int = 4,
+) -> CheckResult:
+    client = KintoClient(server_url=server)
+    entries = [
+        entry
+        for entry in await client.get_monitor_changes()
+        if entry["bucket"] in buckets
+    ]
+
+    # Collections can be verified by other replicas (see ``WORK_QUEUE_ENABLED``).
+    verified = await WORK_QUEUE.map(
+        verify_collections,
+        entries,
+        server=server,
+        root_hash=root_hash,
+        max_concurrent_verifications=max_concurrent_verifications,
+    )
 
+    errors = {cid: error for cid, error in verified if error is not None}
     return len(errors) == 0, errors
@@ -1,8 +1,10 @@
 import asyncio
+import contextlib
 import importlib
 import json
 import logging.config
 import os
+import random
 import subprocess
 import time
 from typing import Any, Dict, List, Optional, Tuple, Union
@@ -52,6 +54,40 @@ METRICS = {
         documentation="Approximate number of pending asyncio tasks in this process",
         labelnames=["loop_name"],
     ),
+    "cache_lookups": prometheus_client.Counter(
+        name=f"{config.METRICS_PREFIX}_cache_lookups",
+        documentation="Counter of cache lookups by tier and result",
+        labelnames=[
+            "tier",
+            "result",
+        ],
+    ),
+    "coalesced_requests": prometheus_client.Counter(
+        name=f"{config.METRICS_PREFIX}_coalesced_requests",
+        documentation="Counter of HTTP requests saved by joining identical in-flight ones",
+        labelnames=["function"],
+    ),
+    "host_requests": prometheus_client.Gauge(
+        name=f"{config.METRICS_PREFIX}_host_requests",
+        documentation="Gauge of outbound HTTP requests per host, active or queued",
+        labelnames=["host", "state"],
+    ),
+    "http_cache_requests": prometheus_client.Counter(
+        name=f"{config.METRICS_PREFIX}_http_cache_requests",
+        documentation="Counter of cacheable HTTP requests by result (hit, revalidated, miss)",
+        labelnames=["result"],
+    ),
+    "cache_payload_bytes": prometheus_client.Histogram(
+        name=f"{config.METRICS_PREFIX}_cache_payload_bytes",
+        documentation="Histogram of the size of payloads stored in cache",
+        buckets=[2**i for i in range(8, 26, 2)] + [float("inf")],
+        labelnames=["key"],
+    ),
+    "memory_cache_size": prometheus_client.Gauge(
+        name=f"{config.METRICS_PREFIX}_memory_cache_size",
+        documentation="Gauge of the in-memory cache size in entries and bytes",
+        labelnames=["unit"],
+    ),
     "check_run_duration_seconds": prometheus_client.Histogram(
         name=f"{config.METRICS_PREFIX}_check_run_duration_seconds",
         documentation="Histogram of check run duration in seconds",
@@ -87,6 +123,10 @@ METRICS = {
 }
 
 
+# Background refreshes of stale results in progress, by cache key.
+_background_refreshes: Dict[str, asyncio.Task] = {}
+
+
 class Checks:
     @classmethod
     def from_conf(cls, conf):
@@ -162,24 +202,83 @@ class Check:
 
         self._plot = plot
 
-    async def run(
-        self, cache=None, events=None, force=False
-    ) -> Tuple[str, bool, Any, float]:
-        identifier = f"{self.project}/{self.name}"
-
+    @property
+    def cache_key(self) -> str:
         # Caution: the cache key may contain secrets and should never be exposed.
         # Cache implementations should take care of hashing/encrypting keys if needed.
-        cache_key = f"{identifier}-" + ",".join(
+        identifier = f"{self.project}/{self.name}"
+        return f"{identifier}-" + ",".join(
             f"{k}:{v}" for k, v in sorted(self.params.items())
         )
 
+    @staticmethod
+    def age(result: Tuple[str, bool, Any, float]) -> float:
+        """
+        Return the age in seconds of the specified result.
+        """
+        datetimeiso, _, _, _ = result
+        age = utils.utcnow() - utils.utcfromisoformat(datetimeiso)
+        return age.total_seconds()
+
+    def is_stale(self, result: Tuple[str, bool, Any, float]) -> bool:
+        """
+        Return True if the specified result is older than the check TTL.
+        """
+        return self.age(result) > self.ttl
+
+    async def run(
+        self, cache=None, events=None, force=False, max_age=None
+    ) -> Tuple[str, bool, Any, float]:
+        """
+        Return the cached result, or run the check if it is missing. If
+        ``max_age`` is specified, the check is also run if the cached result
+        is older than ``max_age`` seconds.
+        """
         # First, check if we have a cached result.
-        result = await cache.get(cache_key) if cache else None
+        result = await cache.get(self.cache_key) if cache and not force else None
+        if result is not None and max_age is not None and self.age(result) > max_age:
+            return await self._execute(cache=cache, events=events, max_age=max_age)
+        return await self.serve(result, cache=cache, events=events, force=force)
+
+    async def serve(
+        self, result, cache=None, events=None, force=False
+    ) -> Tuple[str, bool, Any, float]:
+        """
+        Return the specified cached result, or run the check if it is missing.
+        """
         if result is not None and not force:
+            if config.CACHE_STALE_TTL_SECONDS > 0 and self.is_stale(result):
+                # Serve the stale result right away, and refresh it in background.
+                self._refresh_in_background(cache, events)
             # Return previously cached result, do not bother waiting
             # for the latest check run to finish.
             return result
 
+        return await self._execute(cache=cache, events=events, force=force)
+
+    def _refresh_in_background(self, cache, events):
+        cache_key = self.cache_key
+        if cache_key in _background_refreshes:
+            # A refresh of this check is already in progress.
+            return
+
+        def done(task):
+            del _background_refreshes[cache_key]
+            if not task.cancelled() and (exc := task.exception()) is not None:
+                logger.error(
+                    f"Background refresh of {self.project}/{self.name} failed",
+                    exc_info=exc,
+                )
+
+        task = asyncio.create_task(self._execute(cache=cache, events=events))
+        _background_refreshes[cache_key] = task
+        task.add_done_callback(done)
+
+    async def _execute(
+        self, cache=None, events=None, force=False, max_age=None
+    ) -> Tuple[str, bool, Any, float]:
+        cache_key = self.cache_key
+
         # Run the check code.
         # But wait for any other parallel run of this same check to finish
         # to avoid running the same check multiple times in parallel.
@@ -198,7 +297,21 @@ class Check:
                 # See last run info.
                 _, last_success, _, _ = result
 
-            if result is None or force:
+            # A stale result may have been refreshed while we were waiting for the lock.
+            is_stale = (
+                result is not None
+                and config.CACHE_STALE_TTL_SECONDS > 0
+                and self.is_stale(result)
+            )
+
+            # Another run may have refreshed the result while we were waiting.
+            is_outdated = (
+                result is not None
+                and max_age is not None
+                and self.age(result) > max_age
+            )
+
+            if result is None or is_stale or is_outdated or force:
                 # Execute the check again.
                 before = time.time()
                 success, data = await self.func(**self.params)
@@ -209,13 +322,17 @@ class Check:
 
                 result = utils.utcnow().isoformat(), success, data, duration
                 if cache:
-                    await cache.set(cache_key, result, ttl=self.ttl)
+                    # Keep expired results a bit longer, to serve them while refreshing.
+                    ttl = self.ttl + config.CACHE_STALE_TTL_SECONDS
+                    await cache.set(cache_key, result, ttl=ttl)
 
                 # Notify listeners about check run/state.
                 if events:
                     payload = {
                         "check": self,
                         "result": {
+                            "datetime": result[0],
+                            "duration": duration,
                             "success": success,
                             "data": data,
                         },
@@ -273,6 +390,51 @@ class Check:
         )
 
 
+class ResultsBroadcaster:
+    """
+    Push the results of configured checks to every subscriber.
+
+    Each result is serialized once, regardless of the number of subscribers.
+    """
+
+    QUEUE_MAX_SIZE = 100
+
+    def __init__(self, checks: Checks):
+        self.cache_keys = {c.cache_key for c in checks.all}
+        self.subscribers: List[asyncio.Queue] = []
+
+    @contextlib.contextmanager
+    def subscribe(self):
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.QUEUE_MAX_SIZE)
+        self.subscribers.append(queue)
+        try:
+            yield queue
+        finally:
+            self.subscribers.remove(queue)
+
+    def publish(self, event, payload):
+        check = payload["check"]
+        # Ignore runs with parameters overridden in URL query.
+        if check.cache_key not in self.cache_keys:
+            return
+        result = payload["result"]
+        message = utils.json_dumps(
+            {
+                **check.info,
+                "datetime": result["datetime"],
+                "duration": int(result["duration"] * 1000),
+                "age": 0,
+                "success": result["success"],
+                "data": result["data"],
+            }
+        )
+        for queue in self.subscribers:
+            if queue.full():
+                # Slow subscriber, drop its oldest message.
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+
 @routes.get("/")
 async def hello(request):
     # When visiting the root URL with a browser, redirect to
@@ -288,7 +450,10 @@ async def hello(request):
         "settings": {
             "cache": request.app["telescope.cache"].__class__.__name__,
             "cache_lock_enabled": config.CACHE_LOCK_ENABLED,
+            "scheduler_enabled": config.SCHEDULER_ENABLED,
+            "work_queue_enabled": utils.WORK_QUEUE.client is not None,
             "limit_requests_concurrency": config.LIMIT_REQUEST_CONCURRENCY,
+            "limit_requests_concurrency_per_host": config.LIMIT_REQUEST_CONCURRENCY_PER_HOST,
             "limit_global_concurrency": config.LIMIT_GLOBAL_CONCURRENCY,
             "request_max_retries": config.REQUESTS_MAX_RETRIES,
             "request_timeout_seconds": config.REQUESTS_TIMEOUT_SECONDS,
@@ -442,6 +607,41 @@ async def checkpoint(request):
     )[0]
 
 
+@routes.get("/events")
+async def results_stream(request):
+    """
+    Server-Sent Events stream of check results, as they are obtained.
+    """
+    broadcaster = request.app["telescope.broadcaster"]
+
+    response = web.StreamResponse(
+        headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+        }
+    )
+    await response.prepare(request)
+
+    with broadcaster.subscribe() as queue:
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(
+                        queue.get(), timeout=config.EVENTS_KEEPALIVE_SECONDS
+                    )
+                    await response.write(
+                        f"event: check:run\ndata: {message}\n\n".encode()
+                    )
+                except asyncio.TimeoutError:
+                    # Comment line, to keep the connection open.
+                    await response.write(b": keep-alive\n\n")
+        except ConnectionResetError:
+            # Client went away.
+            pass
+
+    return response
+
+
 @routes.get("/diagram.svg")
 async def svg_diagram(request):
     path = config.DIAGRAM_FILE
@@ -453,19 +653,32 @@ async def svg_diagram(request):
 
 
 async def _run_checks_parallel(checks, cache, tracker, history, events, force=False):
-    futures = [check.run(cache=cache, events=events, force=force) for check in checks]
+    # Fetch all cached results at once.
+    cached = (
+        await cache.get_many([check.cache_key for check in checks])
+        if cache and not force
+        else [None] * len(checks)
+    )
+    futures = [
+        check.serve(result, cache=cache, events=events, force=force)
+        for check, result in zip(checks, cached)
+    ]
     results = await utils.run_parallel(*futures)
+    histories = await history.fetch_many(
+        [(check.project, check.name) for check in checks]
+    )
 
     body = []
-    for check, result in zip(checks, results):
+    for check, result, scalar_history in zip(checks, results, histories):
         datetimeiso, success, data, duration = result
+        age = utils.utcnow() - utils.utcfromisoformat(datetimeiso)
         buglist = await tracker.fetch(check.project, check.name)
-        scalar_history = await history.fetch(check.project, check.name)
         body.append(
             {
                 **check.info,
                 "datetime": datetimeiso,
                 "duration": int(duration * 1000),
+                "age": int(age.total_seconds()),
                 "success": success,
                 "data": data,
                 "buglist": buglist,
@@ -546,15 +759,41 @@ def init_app(checks: Checks):
         integrations=[AioHttpIntegration()],
     )
 
-    app["telescope.cache"] = (
-        utils.RedisCache(url=config.REDIS_CACHE_URL, key_prefix=config.REDIS_KEY_PREFIX)
-        if config.REDIS_CACHE_URL
-        else utils.InMemoryCache()
+    cache: utils.Cache
+    if config.REDIS_CACHE_URL:
+        cache = utils.RedisCache(
+            url=config.REDIS_CACHE_URL,
+            key_prefix=config.REDIS_KEY_PREFIX,
+            codec=config.CACHE_CODEC,
+            compression=config.CACHE_COMPRESSION,
+            compression_min_bytes=config.CACHE_COMPRESSION_MIN_BYTES,
+        )
+        cache.metric = METRICS["cache_payload_bytes"]
+        if config.CACHE_L1_MAX_ENTRIES > 0:
+            cache = utils.TieredCache(
+                cache,
+                max_entries=config.CACHE_L1_MAX_ENTRIES,
+                max_ttl=config.CACHE_L1_MAX_TTL_SECONDS,
+            )
+            cache.metric = METRICS["cache_lookups"]
+            cache.l1.metric = METRICS["memory_cache_size"]
+            app.cleanup_ctx.append(cache.invalidation_context)
+    else:
+        cache = utils.InMemoryCache(
+            max_entries=config.CACHE_MAX_ENTRIES, max_bytes=config.CACHE_MAX_BYTES
+        )
+        cache.metric = METRICS["memory_cache_size"]
+    app["telescope.cache"] = cache
+    utils.HTTP_CACHE.cache = cache if config.HTTP_CACHE_ENABLED else None
+    utils.WORK_QUEUE.connect(
+        config.REDIS_CACHE_URL if config.WORK_QUEUE_ENABLED else "",
+        key_prefix=config.REDIS_KEY_PREFIX,
     )
     app["telescope.checks"] = checks
     app["telescope.tracker"] = utils.BugTracker(cache=app["telescope.cache"])
     app["telescope.history"] = utils.History(cache=app["telescope.cache"])
     app["telescope.events"] = utils.EventEmitter()
+    app["telescope.broadcaster"] = ResultsBroadcaster(checks)
     app["telescope.metrics"] = METRICS
 
     utils.setup_metrics(METRICS)
@@ -578,6 +817,7 @@ def init_app(checks: Checks):
     # React to check run / state changes.
     app["telescope.events"].on("check:run", _log_result)
     app["telescope.events"].on("check:state:changed", _send_sentry)
+    app["telescope.events"].on("check:run", app["telescope.broadcaster"].publish)
 
     return app
 
@@ -621,20 +861,79 @@ async def observe_event_loop(
         logger.debug(f"Event loop lag: {int(lag * 1000)}ms, pending tasks: {pending}")
 
 
+async def refresh_check_periodically(check: Check, cache, events, jitter_ratio: float):
+    """
+    Run the check forever, refreshing its cached result before it expires.
+    """
+    # Spread the first runs, so that checks with the same TTL don't expire together.
+    await asyncio.sleep(random.uniform(0, check.ttl * jitter_ratio))  # nosec
+    age = duration = 0.0
+    while True:
+        # Skip the run if the cached result was refreshed in the meantime
+        # (eg. by another instance sharing the same cache).
+        max_age = check.ttl * (1 - jitter_ratio) - duration
+        try:
+            result = await check.run(cache=cache, events=events, max_age=max_age)
+            _, _, _, duration = result
+            age = check.age(result)
+        except Exception as e:
+            logger.exception(e)
+            age = duration = 0.0
+        # Start the next run so that it completes a bit before the cached result
+        # expires. The random jitter prevents runs from synchronizing over time.
+        jitter = random.uniform(0, jitter_ratio)  # nosec
+        await asyncio.sleep(max(0, check.ttl * (1 - jitter) - age - duration))
+
+
+async def refresh_checks_periodically(checks: Checks, cache, events):
+    """
+    Keep the cached results of all configured checks warm, so that
+    endpoints don't have to wait for checks to run.
+    """
+    tasks = [
+        asyncio.create_task(
+            refresh_check_periodically(
+                check, cache, events, jitter_ratio=config.SCHEDULER_JITTER_RATIO
+            )
+        )
+        for check in checks.all
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    except asyncio.CancelledError:
+        # Wait for all check tasks to be cancelled.
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
 async def background_tasks(app):
     """
     Start background tasks when the app starts, and cleanup when the app stops.
     """
-    bg_task = asyncio.create_task(
-        observe_event_loop(
-            loop=asyncio.get_running_loop(),
-            loop_name="main",
-            interval=config.EVENT_LOOP_OBSERVE_INTERVAL_SECONDS,
+    bg_tasks = [
+        asyncio.create_task(
+            observe_event_loop(
+                loop=asyncio.get_running_loop(),
+                loop_name="main",
+                interval=config.EVENT_LOOP_OBSERVE_INTERVAL_SECONDS,
+            )
         )
-    )
+    ]
+    if config.SCHEDULER_ENABLED:
+        bg_tasks.append(
+            asyncio.create_task(
+                refresh_checks_periodically(
+                    checks=app["telescope.checks"],
+                    cache=app["telescope.cache"],
+                    events=app["telescope.events"],
+                )
+            )
+        )
+    if utils.WORK_QUEUE.client is not None:
+        bg_tasks.append(asyncio.create_task(utils.WORK_QUEUE.work_forever()))
     yield
-    bg_task.cancel()
-    await bg_task
+    for bg_task in bg_tasks:
+        bg_task.cancel()
+        await bg_task
 
 
 def main(argv):
@@ -39,6 +39,9 @@ REQUESTS_DNS_CACHE_TTL_SECONDS = config(
 )
 REQUESTS_MAX_RETRIES = config("REQUESTS_MAX_RETRIES", default=2, cast=int)
 LIMIT_REQUEST_CONCURRENCY = config("LIMIT_REQUEST_CONCURRENCY", default=128, cast=int)
+LIMIT_REQUEST_CONCURRENCY_PER_HOST = config(
+    "LIMIT_REQUEST_CONCURRENCY_PER_HOST", default=0, cast=int
+)
 CLIENT_PARALLEL_REQUESTS = config(
     "CLIENT_PARALLEL_REQUESTS", default=LIMIT_REQUEST_CONCURRENCY, cast=int
 )
@@ -93,7 +96,41 @@ REDIS_LOCK_TIMEOUT_SECONDS = config("REDIS_LOCK_TIMEOUT_SECONDS", default=300, c
 REDIS_LOCK_BLOCKING_TIMEOUT_SECONDS = config(
     "REDIS_LOCK_BLOCKING_TIMEOUT_SECONDS", default=180, cast=int
 )
+# Expired results are kept this long in cache, and served while being refreshed.
+CACHE_STALE_TTL_SECONDS = config("CACHE_STALE_TTL_SECONDS", default=0, cast=int)
+# Serialization of values stored in Redis (``json`` or ``orjson``).
+CACHE_CODEC = config("CACHE_CODEC", default="json")
+# Compression of values stored in Redis (``zlib``, ``zstd``, or empty to disable).
+CACHE_COMPRESSION = config("CACHE_COMPRESSION", default="")
+CACHE_COMPRESSION_MIN_BYTES = config(
+    "CACHE_COMPRESSION_MIN_BYTES", default=1024, cast=int
+)
+# Store responses of HTTP requests in cache, and revalidate them when possible.
+HTTP_CACHE_ENABLED = config("HTTP_CACHE_ENABLED", default=False, cast=bool)
+HTTP_CACHE_MAX_BODY_SIZE = config(
+    "HTTP_CACHE_MAX_BODY_SIZE", default=1024 * 1024, cast=int
+)
+# Stale responses are kept this long in cache, to be revalidated.
+HTTP_CACHE_TTL_SECONDS = config("HTTP_CACHE_TTL_SECONDS", default=3600, cast=int)
+# Bounds of the in-memory cache, used when Redis is not configured (0 means unbounded).
+CACHE_MAX_ENTRIES = config("CACHE_MAX_ENTRIES", default=0, cast=int)
+CACHE_MAX_BYTES = config("CACHE_MAX_BYTES", default=0, cast=int)
+# In-process cache in front of Redis (0 to disable).
+CACHE_L1_MAX_ENTRIES = config("CACHE_L1_MAX_ENTRIES", default=0, cast=int)
+CACHE_L1_MAX_TTL_SECONDS = config("CACHE_L1_MAX_TTL_SECONDS", default=300, cast=int)
 CACHE_LOCK_ENABLED = config("CACHE_LOCK_ENABLED", default=True, cast=bool)
+SCHEDULER_ENABLED = config("SCHEDULER_ENABLED", default=False, cast=bool)
+# Checks are refreshed up to this ratio of their TTL before their cached result expires.
+SCHEDULER_JITTER_RATIO = config("SCHEDULER_JITTER_RATIO", default=0.1, cast=float)
+# Share the batches of fan-out checks among the replicas connected to Redis.
+WORK_QUEUE_ENABLED = config("WORK_QUEUE_ENABLED", default=False, cast=bool)
+WORK_QUEUE_BATCH_SIZE = config("WORK_QUEUE_BATCH_SIZE", default=50, cast=int)
+# Batches not completed by other replicas within this time are run locally.
+WORK_QUEUE_TIMEOUT_SECONDS = config("WORK_QUEUE_TIMEOUT_SECONDS", default=600, cast=int)
+WORK_QUEUE_POLL_INTERVAL_SECONDS = config(
+    "WORK_QUEUE_POLL_INTERVAL_SECONDS", default=1.0, cast=float
+)
+EVENTS_KEEPALIVE_SECONDS = config("EVENTS_KEEPALIVE_SECONDS", default=15, cast=float)
 METRICS_PREFIX = config("METRICS_PREFIX", default="telescope")
 EVENT_LOOP_OBSERVE_INTERVAL_SECONDS = config(
     "EVENT_LOOP_OBSERVE_INTERVAL_SECONDS", default=5.0, cast=float
@@ -13,11 +13,14 @@ export default class Dashboard extends Component {
     this.firstLoad = true;
     this.currentParallelRequests = 0;
     this.maxParallelRequests = Infinity;
+    this.pendingRequests = [];
+    this.eventSource = null;
 
     this.triggerRecheck = this.triggerRecheck.bind(this);
     this.fetchCheckResult = this.fetchCheckResult.bind(this);
     this.setFocusedCheck = this.setFocusedCheck.bind(this);
     this.onHashChange = this.onHashChange.bind(this);
+    this.onResultPushed = this.onResultPushed.bind(this);
     this.state = {
       checks: {},
       results: {},
@@ -70,6 +73,9 @@ export default class Dashboard extends Component {
       checks,
       results,
     });
+    // Receive results as soon as checks are executed on the server.
+    this.eventSource = new EventSource(new URL("/events", ROOT_URL).toString());
+    this.eventSource.addEventListener("check:run", this.onResultPushed);
     // Watch history to focus check.
     window.addEventListener("hashchange", this.onHashChange);
   }
@@ -79,9 +85,33 @@ export default class Dashboard extends Component {
     Object.values(recheckTimeouts).forEach((timeoutId) => {
       clearTimeout(timeoutId);
     });
+    if (this.eventSource) {
+      this.eventSource.close();
+    }
     window.removeEventListener("hashchange", this.onHashChange);
   }
 
+  onResultPushed(event) {
+    const pushed = JSON.parse(event.data);
+    const key = `${pushed.project}.${pushed.name}`;
+    const check = this.state.checks[key];
+    if (!check) {
+      return;
+    }
+    // Keep the fields that are not pushed (eg. bugs, history).
+    const results = {
+      ...this.state.results,
+      [key]: {
+        ...this.state.results[key],
+        ...pushed,
+        isLoading: false,
+      },
+    };
+    this.setState({ results });
+    // The result is fresh, postpone the next fetch of this check.
+    this.scheduleRecheck(check, check.ttl * 1000);
+  }
+
   componentDidUpdate() {
     this.updateFavicon();
     // Check if page has state on first load (after render)
@@ -128,7 +158,12 @@ export default class Dashboard extends Component {
 
     // Reschedule the check
     const interval = result.isIncomplete ? RETRY_INTERVAL : check.ttl * 1000;
+    this.scheduleRecheck(check, interval);
+  }
+
+  scheduleRecheck(check, interval) {
     const key = `${check.project}.${check.name}`;
+    clearTimeout(this.state.recheckTimeouts[key]);
     const timeout = setTimeout(() => this.triggerRecheck(check), interval);
     const recheckTimeouts = {
       ...this.state.recheckTimeouts,
@@ -139,6 +174,22 @@ export default class Dashboard extends Component {
     });
   }
 
+  async acquireRequestSlot() {
+    if (this.currentParallelRequests >= this.maxParallelRequests) {
+      // Wait for a running request to release its slot.
+      await new Promise((resolve) => this.pendingRequests.push(resolve));
+    }
+    this.currentParallelRequests++;
+  }
+
+  releaseRequestSlot() {
+    this.currentParallelRequests--;
+    const next = this.pendingRequests.shift();
+    if (next) {
+      next();
+    }
+  }
+
   async fetchCheckResult(check, options = {}) {
     // Mark the check as loading and then proceed
     const key = `${check.project}.${check.name}`;
@@ -165,14 +216,12 @@ export default class Dashboard extends Component {
           let response;
           let result;
           try {
-            if (!refreshSecret) {
-              // Only wait if the check is executed in the background.
-              // (Refresh means a human clicked on the UI)
-              while (this.currentParallelRequests >= this.maxParallelRequests) {
-                await new Promise((resolve) => setTimeout(resolve, 50));
-              }
+            if (refreshSecret) {
+              // Do not wait if a human clicked on the UI.
+              this.currentParallelRequests++;
+            } else {
+              await this.acquireRequestSlot();
             }
-            this.currentParallelRequests++;
             console.debug(
               `Current concurrent checks: ${this.currentParallelRequests}/${this.maxParallelRequests}`,
             );
@@ -197,7 +246,7 @@ export default class Dashboard extends Component {
               isIncomplete: true, // Distinguish network errors from failing checks.
             };
           } finally {
-            this.currentParallelRequests--;
+            this.releaseRequestSlot();
             const results = {
               ...this.state.results,
               [key]: result,
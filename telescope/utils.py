@@ -1,22 +1,32 @@
 import asyncio
 import contextvars
+import copy
 import decimal
 import email.utils
 import functools
 import hashlib
 import json
 import logging
+import math
+import secrets
+import sys
 import textwrap
 import threading
+import time
 import urllib.parse
+import zlib
+from collections import OrderedDict, deque
 from concurrent.futures import ProcessPoolExecutor
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
 from itertools import chain
+from types import FunctionType
 from typing import (
     Any,
     AsyncGenerator,
     Awaitable,
+    Callable,
+    Deque,
     Dict,
     List,
     Optional,
@@ -37,7 +47,19 @@ from telescope import config
 from telescope.typings import BugInfo
 
 
+try:
+    import orjson
+except ImportError:  # pragma: nocover
+    orjson = None  # ty: ignore[invalid-assignment]
+
+try:
+    import zstandard  # ty: ignore[unresolved-import]
+except ImportError:  # pragma: nocover
+    zstandard = None
+
+
 T = TypeVar("T")
+TaskFunction = TypeVar("TaskFunction", bound=FunctionType)
 
 
 logger = logging.getLogger(__name__)
@@ -47,9 +69,9 @@ _global_session: contextvars.ContextVar[aiohttp.ClientSession | None] = (
 )
 
 
-class InstrumentedSemaphore(asyncio.Semaphore):
+class InstrumentedProcessPoolExecutor(ProcessPoolExecutor):
     """
-    A semaphore that can be instrumented with a gauge/counter metric.
+    A ProcessPoolExecutor that can be instrumented with a gauge/counter metric.
     """
 
     def __init__(self, *args, **kwargs):
@@ -64,27 +86,41 @@ class InstrumentedSemaphore(asyncio.Semaphore):
     def metric(self, value):
         self._metric = value
 
-    async def acquire(self):
-        # Actually wait until we *have* the semaphore before incrementing the metric.
-        res = await super().acquire()
-        if self.metric:
-            self.metric.inc()
-        return res
+    def submit(self, fn, *args, **kwargs):
+        if not self.metric:  # pragma: nocover
+            return super().submit(fn, *args, **kwargs)
 
-    def release(self):
-        super().release()
-        if self.metric:
+        self.metric.inc()
+        future = super().submit(fn, *args, **kwargs)
+
+        original_done = future.add_done_callback
+
+        def instrumented_done_callback(fut):
             self.metric.dec()
+            return original_done(fut)
 
+        future.add_done_callback(instrumented_done_callback)
+        return future
 
-class InstrumentedProcessPoolExecutor(ProcessPoolExecutor):
+
+class HostRequestScheduler:
     """
-    A ProcessPoolExecutor that can be instrumented with a gauge/counter metric.
+    Restrict parallel requests globally and per host.
+
+    Requests waiting for a slot are queued per host, and freed slots are handed
+    to the hosts in turn, so that a burst against one host does not starve the
+    requests made to the others.
     """
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+    def __init__(self, limit: int, limit_per_host: int = 0):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self._active = 0
+        self._active_by_host: Dict[str, int] = {}
+        # Hosts with pending requests, in round-robin order.
+        self._waiters: OrderedDict[str, Deque[asyncio.Future]] = OrderedDict()
         self._metric = None
+        self._host_metric = None
 
     @property
     def metric(self):
@@ -94,25 +130,95 @@ class InstrumentedProcessPoolExecutor(ProcessPoolExecutor):
     def metric(self, value):
         self._metric = value
 
-    def submit(self, fn, *args, **kwargs):
-        if not self.metric:  # pragma: nocover
-            return super().submit(fn, *args, **kwargs)
+    @property
+    def host_metric(self):
+        return self._host_metric
 
-        self.metric.inc()
-        future = super().submit(fn, *args, **kwargs)
+    @host_metric.setter
+    def host_metric(self, value):
+        self._host_metric = value
 
-        original_done = future.add_done_callback
+    def _has_room(self, host: str) -> bool:
+        if self._active >= self.limit:
+            return False
+        if not host or self.limit_per_host <= 0:
+            return True
+        return self._active_by_host.get(host, 0) < self.limit_per_host
 
-        def instrumented_done_callback(fut):
+    def _start(self, host: str):
+        self._active += 1
+        self._active_by_host[host] = self._active_by_host.get(host, 0) + 1
+        if self.metric:
+            self.metric.inc()
+        if self.host_metric:
+            self.host_metric.labels(host, "active").inc()
+
+    def _wakeup(self):
+        while self._active < self.limit:
+            host = next((h for h in self._waiters if self._has_room(h)), None)
+            if host is None:
+                return
+            queue = self._waiters.pop(host)
+            waiter = queue.popleft()
+            if queue:
+                # Back of the line for the next slot.
+                self._waiters[host] = queue
+            if self.host_metric:
+                self.host_metric.labels(host, "queued").dec()
+            self._start(host)
+            waiter.set_result(None)
+
+    async def acquire(self, host: str = ""):
+        if host not in self._waiters and self._has_room(host):
+            self._start(host)
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(host, deque()).append(waiter)
+        if self.host_metric:
+            self.host_metric.labels(host, "queued").inc()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed to us right before the cancellation.
+                self.release(host)
+            else:
+                queue = self._waiters[host]
+                queue.remove(waiter)
+                if not queue:
+                    del self._waiters[host]
+                if self.host_metric:
+                    self.host_metric.labels(host, "queued").dec()
+            raise
+
+    def release(self, host: str = ""):
+        self._active -= 1
+        self._active_by_host[host] -= 1
+        if not self._active_by_host[host]:
+            del self._active_by_host[host]
+        if self.metric:
             self.metric.dec()
-            return original_done(fut)
+        if self.host_metric:
+            self.host_metric.labels(host, "active").dec()
+        self._wakeup()
 
-        future.add_done_callback(instrumented_done_callback)
-        return future
+    @asynccontextmanager
+    async def slot(self, host: str = ""):
+        await self.acquire(host)
+        try:
+            yield
+        finally:
+            self.release(host)
 
 
-# global semaphore to restrict parallel http requests
-REQUEST_LIMIT = InstrumentedSemaphore(config.LIMIT_REQUEST_CONCURRENCY)
+# size of the chunks read when streaming responses
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# global scheduler to restrict parallel http requests
+REQUEST_LIMIT = HostRequestScheduler(
+    config.LIMIT_REQUEST_CONCURRENCY, config.LIMIT_REQUEST_CONCURRENCY_PER_HOST
+)
 GLOBAL_PROCESS_POOL = InstrumentedProcessPoolExecutor(config.MULTIPROCESS_MAX_WORKERS)
 
 
@@ -123,20 +229,94 @@ def setup_metrics(existing_metrics: Dict[str, Any]):
     REQUEST_LIMIT.metric = existing_metrics.get("parallelism_gauge").labels(  # ty: ignore[unresolved-attribute]
         "request"
     )
+    REQUEST_LIMIT.host_metric = existing_metrics.get("host_requests")
     GLOBAL_PROCESS_POOL.metric = existing_metrics.get("parallelism_gauge").labels(  # ty: ignore[unresolved-attribute]
         "process"
     )
+    REQUEST_COALESCER.metric = existing_metrics.get("coalesced_requests")
+    HTTP_CACHE.metric = existing_metrics.get("http_cache_requests")
 
 
 def limit_request_concurrency(func):
+    """
+    Wait for a request slot, on the host of the ``url`` argument if any.
+    """
+
     @functools.wraps(func)
     async def wrapper(*args, **kwargs):
-        async with REQUEST_LIMIT:
+        url = kwargs.get("url", args[0] if args else None)
+        host = urllib.parse.urlsplit(url).netloc if isinstance(url, str) else ""
+        async with REQUEST_LIMIT.slot(host):
             return await func(*args, **kwargs)
 
     return wrapper
 
 
+class _InflightRequest:
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.callers = 1
+
+
+class RequestCoalescer:
+    """
+    Share the outcome of identical in-flight requests between their callers.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Tuple, _InflightRequest] = {}
+        self._metric = None
+
+    @property
+    def metric(self):
+        return self._metric
+
+    @metric.setter
+    def metric(self, value):
+        self._metric = value
+
+    async def run(self, key: Tuple, func: Callable[[], Awaitable[T]]) -> T:
+        request = self._inflight.get(key)
+        if request is None:
+            request = _InflightRequest(asyncio.ensure_future(func()))
+            self._inflight[key] = request
+
+            def done(future):
+                del self._inflight[key]
+                if not future.cancelled():
+                    future.exception()  # Mark as retrieved.
+
+            request.future.add_done_callback(done)
+        else:
+            request.callers += 1
+            if self.metric:
+                self.metric.labels(key[0]).inc()
+
+        result = await asyncio.shield(request.future)
+        # Callers of a shared request get their own copy of the result.
+        return copy.deepcopy(result) if request.callers > 1 else result
+
+
+REQUEST_COALESCER = RequestCoalescer()
+
+
+def coalesce_requests(func):
+    """
+    Decorator for request helpers, to perform identical concurrent calls once.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(url: str, **kwargs):
+        key = (
+            func.__name__,
+            url,
+            json_dumps(kwargs, sort_keys=True, default=str),
+        )
+        return await REQUEST_COALESCER.run(key, lambda: func(url, **kwargs))
+
+    return wrapper
+
+
 class Cache(Protocol):
     def clear(self):
         """Clear all cached content."""
@@ -154,6 +334,15 @@ class Cache(Protocol):
         """Get a value or None if missing/expired."""
         ...
 
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """Get several values at once, with None for missing/expired ones."""
+        return [await self.get(key) for key in keys]
+
+    async def set_many(self, items: Dict[str, Any], ttl: int):
+        """Set several values at once, with the same TTL in seconds."""
+        for key, value in items.items():
+            await self.set(key, value, ttl)
+
     async def ping(self) -> bool:
         """Return True if the cache is reachable, False otherwise."""
         try:
@@ -168,33 +357,140 @@ class Cache(Protocol):
 
 
 class InMemoryCache(Cache):
-    def __init__(self) -> None:
-        self._content: dict[str, tuple[datetime, Any]] = {}
+    """
+    A process-local cache.
+
+    Least recently used entries are evicted first when the number of entries or
+    their estimated size exceeds the configured bounds (0 means unbounded).
+    Sizes are only estimated (and reported) when the size is bounded.
+    Expired entries are swept on every read and write, hence even the entries that
+    are never read again are dropped.
+    """
+
+    # Granularity of the expiry sweeper, in seconds.
+    SWEEP_INTERVAL = 1
+
+    def __init__(self, max_entries: int = 0, max_bytes: int = 0) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._content: OrderedDict[str, tuple[datetime, Any, int]] = OrderedDict()
+        self._bytes = 0
+        # Keys indexed by the sweep slot of their expiration time.
+        self._wheel: dict[int, set[str]] = {}
+        self._swept_slot = self._slot(utcnow())
         self._locks: dict[str, asyncio.Lock] = {}
+        self._lock_users: dict[str, int] = {}
+        self._metric = None
+
+    @property
+    def metric(self):
+        return self._metric
+
+    @metric.setter
+    def metric(self, value):
+        self._metric = value
+        self._update_metric()
+
+    def _update_metric(self):
+        if self.metric:
+            self.metric.labels("entries").set(len(self._content))
+            if self.max_bytes > 0:
+                self.metric.labels("bytes").set(self._bytes)
+
+    def _slot(self, dt: datetime) -> int:
+        return int(dt.timestamp()) // self.SWEEP_INTERVAL
+
+    @staticmethod
+    def _sizeof(value: Any) -> int:
+        try:
+            return len(json_dumps(value))
+        except (TypeError, ValueError):
+            return sys.getsizeof(value)
 
     def clear(self):
         self._content.clear()
-        self._locks.clear()
-
-    def lock(self, key: str):
-        return self._locks.setdefault(key, asyncio.Lock())
+        self._bytes = 0
+        self._wheel.clear()
+        self._update_metric()
+
+    @asynccontextmanager
+    async def lock(self, key: str):
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._lock_users[key] = self._lock_users.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            # Forget the lock once nobody holds it or waits for it.
+            self._lock_users[key] -= 1
+            if self._lock_users[key] == 0:
+                del self._lock_users[key]
+                del self._locks[key]
 
     async def set(self, key: str, value: Any, ttl: int):
-        expires = utcnow() + timedelta(seconds=ttl)
-        self._content[key] = expires, value
+        now = utcnow()
+        self._sweep(now)
+        self._remove(key)
+        expires = now + timedelta(seconds=ttl)
+        # Estimating the size requires serializing the value.
+        size = self._sizeof(value) if self.max_bytes > 0 else 0
+        self._content[key] = expires, value, size
+        self._bytes += size
+        self._wheel.setdefault(self._slot(expires), set()).add(key)
+        while (self.max_entries > 0 and len(self._content) > self.max_entries) or (
+            self.max_bytes > 0 and self._bytes > self.max_bytes and self._content
+        ):
+            self._remove(next(iter(self._content)))
+        self._update_metric()
 
     async def get(self, key: str) -> Optional[Any]:
+        now = utcnow()
+        self._sweep(now)
         try:
-            expires, value = self._content[key]
-            if expires < utcnow():
-                del self._content[key]
+            expires, value, _ = self._content[key]
+            if expires < now:
+                self.delete(key)
                 return None
+            self._content.move_to_end(key)
             return value
 
         except KeyError:
             # Unknown key.
             return None
 
+    def delete(self, key: str):
+        self._remove(key)
+        self._update_metric()
+
+    def _remove(self, key: str):
+        try:
+            expires, _, size = self._content.pop(key)
+        except KeyError:
+            return
+        self._bytes -= size
+        slot = self._slot(expires)
+        keys = self._wheel.get(slot)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._wheel[slot]
+
+    def _sweep(self, now: datetime):
+        """
+        Drop the entries whose expiration slot has fully elapsed.
+        """
+        current = self._slot(now)
+        if current <= self._swept_slot:
+            return
+        for slot in range(self._swept_slot, current):
+            for key in self._wheel.pop(slot, ()):
+                # The key may have been set again with a later expiration.
+                entry = self._content.get(key)
+                if entry is not None and entry[0] < now:
+                    self._remove(key)
+        self._swept_slot = current
+        self._update_metric()
+
 
 class DecimalEncoder(json.JSONEncoder):
     def default(self, o):
@@ -213,18 +509,125 @@ def json_dumps(*args, **kwargs):
     return json.dumps(*args, **kwargs)
 
 
+def _orjson_default(o):  # pragma: nocover
+    if isinstance(o, decimal.Decimal):
+        return str(o)
+    raise TypeError(f"Type is not JSON serializable: {type(o).__name__}")
+
+
+# Serializers of cached values, by name: (identifier, dumps, loads).
+CACHE_CODECS: Dict[
+    str, Tuple[bytes, Callable[[Any], bytes], Callable[[bytes], Any]]
+] = {
+    "json": (b"j", lambda value: json_dumps(value).encode("utf-8"), json.loads),
+}
+if orjson is not None:  # pragma: nocover
+    _orjson_dumps = functools.partial(
+        orjson.dumps, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS
+    )
+    CACHE_CODECS["orjson"] = (b"o", _orjson_dumps, orjson.loads)
+
+# Compressions of cached payloads, by name: (identifier, compress, decompress).
+CACHE_COMPRESSIONS: Dict[
+    str, Tuple[bytes, Callable[[bytes], bytes], Callable[[bytes], bytes]]
+] = {
+    "zlib": (b"z", zlib.compress, zlib.decompress),
+}
+if zstandard is not None:  # pragma: nocover
+    CACHE_COMPRESSIONS["zstd"] = (b"s", zstandard.compress, zstandard.decompress)
+
+# Encoded payloads start with this byte, followed by the codec and compression
+# identifiers. Plain JSON payloads never start with it.
+PAYLOAD_MAGIC = b"\x00"
+NO_COMPRESSION = b"-"
+
+
+def cache_key_label(key: str) -> str:
+    """
+    Return a low cardinality metric label for the specified cache key.
+
+    Check parameters are omitted, since they may contain secrets.
+
+    >>> cache_key_label("project/check-auth:Bearer abc,max_age:3")
+    'project/check'
+    >>> cache_key_label("scalar-history:project/check")
+    'scalar-history'
+    """
+    label = key.split(":", 1)[0]
+    if "/" in label:
+        # Check cache keys end with their parameters.
+        label = label.rsplit("-", 1)[0]
+    return label
+
+
 class RedisCache(Cache):
     version = "v1"
 
-    def __init__(self, url: str, key_prefix: str):
+    def __init__(
+        self,
+        url: str,
+        key_prefix: str,
+        codec: str = "json",
+        compression: str = "",
+        compression_min_bytes: int = 0,
+    ):
         self._r = Redis.from_url(url)
         self.prefix = f"{key_prefix}:{self.version}:"
+        if codec not in CACHE_CODECS:
+            raise ValueError(f"Unsupported cache codec {codec!r}")
+        if compression and compression not in CACHE_COMPRESSIONS:
+            raise ValueError(f"Unsupported cache compression {compression!r}")
+        self.codec = codec
+        self.compression = compression
+        self.compression_min_bytes = compression_min_bytes
+        self._metric = None
+
+    @property
+    def metric(self):
+        return self._metric
+
+    @metric.setter
+    def metric(self, value):
+        self._metric = value
 
     def _key(self, key: str) -> str:
         """Generate a safe Redis key from an arbitrary string."""
         digest = hashlib.sha1(key.encode("utf-8")).hexdigest()  # nosec
         return f"{self.prefix}:{digest}"
 
+    def _encode(self, key: str, value: Any) -> bytes:
+        codec_id, dumps, _ = CACHE_CODECS[self.codec]
+        data = dumps(value)
+        compression_id = NO_COMPRESSION
+        if self.compression and len(data) >= self.compression_min_bytes:
+            compression_id, compress, _ = CACHE_COMPRESSIONS[self.compression]
+            data = compress(data)
+        elif self.codec == "json":
+            # Keep plain JSON payloads readable by previous versions.
+            compression_id = None
+        if compression_id is not None:
+            data = PAYLOAD_MAGIC + codec_id + compression_id + data
+        if self.metric:
+            self.metric.labels(cache_key_label(key)).observe(len(data))
+        return data
+
+    def _decode(self, data: Union[bytes, str]) -> Optional[Any]:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if not data.startswith(PAYLOAD_MAGIC):
+            return json.loads(data)
+        codec_id, compression_id, data = data[1:2], data[2:3], data[3:]
+        loads = {c[0]: c[2] for c in CACHE_CODECS.values()}
+        decompress = {c[0]: c[2] for c in CACHE_COMPRESSIONS.values()}
+        decompress[NO_COMPRESSION] = lambda data: data
+        if codec_id not in loads or compression_id not in decompress:
+            # Written by a process with more codecs available. Consider it missing.
+            logger.warning(
+                f"Unsupported cache payload format {codec_id + compression_id!r}"
+            )
+            return None
+        return loads[codec_id](decompress[compression_id](data))
+
     def clear(self):
         self._r.flushdb()  # pragma: nocover
 
@@ -239,14 +642,153 @@ class RedisCache(Cache):
         )
 
     async def set(self, key: str, value: Any, ttl: int):
-        data = json_dumps(value)
+        data = self._encode(key, value)
         await self._r.set(f"{self._key(key)}:data", data, ex=ttl)
 
     async def get(self, key: str) -> Optional[Any]:
         data = await self._r.get(f"{self._key(key)}:data")
         if data is None:
             return None
-        return json.loads(data)
+        return self._decode(data)
+
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        if not keys:
+            return []
+        datas = await self._r.mget([f"{self._key(key)}:data" for key in keys])
+        return [None if data is None else self._decode(data) for data in datas]
+
+    async def set_many(self, items: Dict[str, Any], ttl: int):
+        async with self._r.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                pipe.set(f"{self._key(key)}:data", self._encode(key, value), ex=ttl)
+            await pipe.execute()
+
+    async def get_with_ttl(self, key: str) -> Tuple[Optional[Any], int]:
+        """Get a value or None, along with its remaining TTL in seconds."""
+        (result,) = await self.get_many_with_ttl([key])
+        return result
+
+    async def get_many_with_ttl(
+        self, keys: List[str]
+    ) -> List[Tuple[Optional[Any], int]]:
+        """Get several values or None, along with their remaining TTL in seconds."""
+        async with self._r.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.get(f"{self._key(key)}:data")
+                pipe.ttl(f"{self._key(key)}:data")
+            replies = await pipe.execute()
+        results: List[Tuple[Optional[Any], int]] = []
+        for data, ttl in zip(replies[::2], replies[1::2]):
+            value = None if data is None else self._decode(data)
+            results.append((None, 0) if value is None else (value, ttl))
+        return results
+
+
+class TieredCache(Cache):
+    """
+    A bounded in-process cache (L1) in front of a Redis cache (L2).
+
+    When a value is set, other processes are notified via Redis pub/sub and drop
+    it from their L1, so that replicas don't serve diverging values.
+    """
+
+    def __init__(self, l2: RedisCache, max_entries: int, max_ttl: int):
+        self.l1 = InMemoryCache(max_entries=max_entries)
+        self.l2 = l2
+        # Values are kept in L1 for this maximum duration, in case some
+        # invalidation messages were missed.
+        self.max_ttl = max_ttl
+        self.channel = f"{l2.prefix}invalidations"
+        # Used to ignore our own invalidation messages.
+        self.instance_id = secrets.token_hex(8)
+        self._metric = None
+
+    @property
+    def metric(self):
+        return self._metric
+
+    @metric.setter
+    def metric(self, value):
+        self._metric = value
+
+    def _count(self, tier: str, result: str):
+        if self.metric:
+            self.metric.labels(tier, result).inc()
+
+    def clear(self):  # pragma: nocover
+        self.l1.clear()
+        self.l2.clear()
+
+    def lock(self, key: str):
+        return self.l2.lock(key)
+
+    async def set(self, key: str, value: Any, ttl: int):
+        await self.set_many({key: value}, ttl)
+
+    async def set_many(self, items: Dict[str, Any], ttl: int):
+        await self.l2.set_many(items, ttl)
+        async with self.l2._r.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                digest = self.l2._key(key)
+                await self.l1.set(digest, value, ttl=min(ttl, self.max_ttl))
+                pipe.publish(self.channel, f"{self.instance_id}:{digest}")
+            await pipe.execute()
+
+    async def get(self, key: str) -> Optional[Any]:
+        (value,) = await self.get_many([key])
+        return value
+
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        digests = [self.l2._key(key) for key in keys]
+        values = [await self.l1.get(digest) for digest in digests]
+        missing = []
+        for i, value in enumerate(values):
+            if value is None:
+                self._count("l1", "miss")
+                missing.append(i)
+            else:
+                self._count("l1", "hit")
+        if not missing:
+            return values
+
+        fetched = await self.l2.get_many_with_ttl([keys[i] for i in missing])
+        for i, (value, ttl) in zip(missing, fetched):
+            if value is None:
+                self._count("l2", "miss")
+                continue
+            self._count("l2", "hit")
+            # Expire from L1 when it expires from L2 (negative if no expiration).
+            l1_ttl = self.max_ttl if ttl < 0 else min(ttl, self.max_ttl)
+            await self.l1.set(digests[i], value, ttl=l1_ttl)
+            values[i] = value
+        return values
+
+    async def listen_invalidations(self):
+        """
+        Drop entries from L1 when they are set by other processes.
+        """
+        while True:
+            try:
+                async with self.l2._r.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    # Invalidations may have been missed while we were not subscribed.
+                    self.l1.clear()
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        instance_id, digest = message["data"].decode().split(":", 1)
+                        if instance_id != self.instance_id:
+                            self.l1.delete(digest)
+            except Exception as e:
+                logger.exception(e)
+                await asyncio.sleep(1)
+
+    async def invalidation_context(self, app: web.Application):
+        """App-level lifecycle context that listens to invalidations."""
+        task = asyncio.create_task(self.listen_invalidations())
+        yield
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
 
 
 class DummyLock:
@@ -302,6 +844,181 @@ def strip_authz_on_exception(func):
     return wrapper
 
 
+class HTTPCache:
+    """
+    Store the decoded responses of GET requests in cache, and revalidate them
+    with conditional requests once they are no longer fresh.
+
+    Request headers are part of the cache key, hence responses that ``Vary``
+    on them, or on credentials, are stored separately.
+    """
+
+    def __init__(self):
+        # Disabled until a cache is configured.
+        self.cache: Optional[Cache] = None
+        self.max_body_size = config.HTTP_CACHE_MAX_BODY_SIZE
+        self.ttl = config.HTTP_CACHE_TTL_SECONDS
+        self._metric = None
+
+    @property
+    def metric(self):
+        return self._metric
+
+    @metric.setter
+    def metric(self, value):
+        self._metric = value
+
+    def _count(self, result: str):
+        if self.metric:
+            self.metric.labels(result).inc()
+
+    @staticmethod
+    def freshness(headers) -> Optional[int]:
+        """
+        Return how long the response can be used without revalidation, or None
+        if it must not be stored.
+        """
+        directives = {}
+        for directive in headers.get("Cache-Control", "").split(","):
+            name, _, value = directive.strip().partition("=")
+            directives[name.lower()] = value.strip('"')
+        if "no-store" in directives:
+            return None
+        if "no-cache" in directives:
+            return 0
+        try:
+            return max(int(directives["max-age"]), 0)
+        except (KeyError, ValueError):
+            pass
+        try:
+            expires = utcfromhttpdate(headers["Expires"])
+            return max(int((expires - utcnow()).total_seconds()), 0)
+        except (KeyError, TypeError, ValueError):
+            return 0
+
+    @classmethod
+    def _no_store(cls, kwargs) -> bool:
+        # Requests with ``Cache-Control: no-store`` (eg. cache busting) bypass the cache.
+        return cls.freshness(kwargs.get("headers") or {}) is None
+
+    @staticmethod
+    def _key(kind: str, url: str, kwargs) -> str:
+        return "http-cache:" + json_dumps(
+            [kind, url, kwargs], sort_keys=True, default=str
+        )
+
+    async def get_fresh(self, kind: str, url: str, **kwargs) -> Tuple[bool, Any]:
+        """
+        Return whether a fresh response is stored, along with its value.
+        """
+        if self.cache is None or self._no_store(kwargs):
+            return False, None
+        entry = await self.cache.get(self._key(kind, url, kwargs))
+        if entry is None or entry["fresh_until"] <= utcnow().timestamp():
+            return False, None
+        self._count("hit")
+        # Cached values may be shared with other callers.
+        return True, copy.deepcopy(entry["value"])
+
+    async def get(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        kind: str,
+        decode: Callable[[aiohttp.ClientResponse], Awaitable[Any]],
+        **kwargs,
+    ) -> Any:
+        """
+        Fetch the specified URL, and ``decode`` the response. ``kind`` identifies
+        the decoded values in the cache.
+        """
+        if self.cache is None or self._no_store(kwargs):
+            async with session.get(url, **kwargs) as response:
+                return await decode(response)
+
+        key = self._key(kind, url, kwargs)
+        entry = await self.cache.get(key)
+        if entry is not None and entry["fresh_until"] > utcnow().timestamp():
+            self._count("hit")
+            # Cached values may be shared with other callers.
+            return copy.deepcopy(entry["value"])
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        async with session.get(url, headers=headers, **kwargs) as response:
+            if entry is not None and response.status == 304:
+                self._count("revalidated")
+                value = copy.deepcopy(entry["value"])
+                entry["etag"] = response.headers.get("ETag", entry["etag"])
+            else:
+                self._count("miss")
+                value = await decode(response)
+                entry = None
+                if response.status == 200 and (
+                    len(await response.read()) <= self.max_body_size
+                ):
+                    entry = {
+                        "value": copy.deepcopy(value),
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified"),
+                    }
+            freshness = self.freshness(response.headers)
+
+        # Responses that are neither fresh nor revalidable cannot be reused.
+        reusable = entry is not None and (
+            freshness or entry["etag"] or entry["last_modified"]
+        )
+        if reusable and freshness is not None:
+            entry["fresh_until"] = utcnow().timestamp() + freshness
+            # Keep stale responses a while, to revalidate them.
+            await self.cache.set(key, entry, ttl=max(freshness, self.ttl))
+        return value
+
+
+HTTP_CACHE = HTTPCache()
+
+
+async def _read_json(response: aiohttp.ClientResponse) -> Any:
+    return await response.json()
+
+
+async def _read_text(response: aiohttp.ClientResponse) -> str:
+    return await response.text()
+
+
+async def _read_json_page(response: aiohttp.ClientResponse) -> Dict[str, Any]:
+    return {
+        "body": await response.json(),
+        "next_page": response.headers.get("Next-Page"),
+    }
+
+
+def serve_fresh_from_http_cache(kind: str):
+    """
+    Decorator for request helpers, to return fresh cached responses right away,
+    without waiting for a request slot.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(url: str, **kwargs):
+            found, value = await HTTP_CACHE.get_fresh(kind, url, **kwargs)
+            if found:
+                return value
+            return await func(url, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@coalesce_requests
+@serve_fresh_from_http_cache("json")
 @limit_request_concurrency
 @strip_authz_on_exception
 @retry_decorator
@@ -309,10 +1026,34 @@ async def fetch_json(url: str, **kwargs) -> Any:
     human_url = urllib.parse.unquote(url)
     logger.debug(f"Fetch JSON from '{human_url}'")
     async with ClientSession() as session:
-        async with session.get(url, **kwargs) as response:
-            return await response.json()
+        return await HTTP_CACHE.get(session, url, "json", _read_json, **kwargs)
+
+
+@coalesce_requests
+@serve_fresh_from_http_cache("json-page")
+@limit_request_concurrency
+@strip_authz_on_exception
+@retry_decorator
+async def _fetch_json_page(url: str, **kwargs) -> Dict[str, Any]:
+    human_url = urllib.parse.unquote(url)
+    logger.debug(f"Fetch JSON page from '{human_url}'")
+    async with ClientSession() as session:
+        return await HTTP_CACHE.get(
+            session, url, "json-page", _read_json_page, **kwargs
+        )
+
+
+async def fetch_json_page(url: str, **kwargs) -> Tuple[Any, Optional[str]]:
+    """
+    Fetch a page of a paginated JSON list, and return its content along with
+    the URL of the next page, if any.
+    """
+    page = await _fetch_json_page(url, **kwargs)
+    return page["body"], page["next_page"]
 
 
+@coalesce_requests
+@serve_fresh_from_http_cache("text")
 @limit_request_concurrency
 @strip_authz_on_exception
 @retry_decorator
@@ -320,10 +1061,10 @@ async def fetch_text(url: str, **kwargs) -> str:
     human_url = urllib.parse.unquote(url)
     logger.debug(f"Fetch text from '{human_url}'")
     async with ClientSession() as session:
-        async with session.get(url, **kwargs) as response:
-            return await response.text()
+        return await HTTP_CACHE.get(session, url, "text", _read_text, **kwargs)
 
 
+@coalesce_requests
 @limit_request_concurrency
 @strip_authz_on_exception
 @retry_decorator
@@ -335,6 +1076,7 @@ async def fetch_head(url: str, **kwargs) -> Tuple[int, CIMultiDict]:
             return response.status, CIMultiDict(response.headers)
 
 
+@coalesce_requests
 @limit_request_concurrency
 @strip_authz_on_exception
 @retry_decorator
@@ -347,6 +1089,33 @@ async def fetch_raw(url: str, **kwargs) -> tuple[int, dict[str, str], bytes]:
             return response.status, dict(response.headers), body
 
 
+@coalesce_requests
+@limit_request_concurrency
+@strip_authz_on_exception
+@retry_decorator
+async def fetch_sha256(
+    url: str, max_size: Optional[int] = None, **kwargs
+) -> Tuple[int, Optional[str]]:
+    """
+    Stream the response body, and return its size and SHA256 hex digest.
+
+    Reading stops as soon as the size exceeds ``max_size``, and no digest is
+    returned in that case.
+    """
+    human_url = urllib.parse.unquote(url)
+    logger.debug(f"Fetch SHA256 of '{human_url}'")
+    h = hashlib.sha256()
+    size = 0
+    async with ClientSession() as session:
+        async with session.get(url, **kwargs) as response:
+            async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    return size, None
+                h.update(chunk)
+    return size, h.hexdigest()
+
+
 def client_session_start(
     loop: asyncio.AbstractEventLoop | None = None,
 ) -> aiohttp.ClientSession:
@@ -363,6 +1132,8 @@ def client_session_start(
         resolver=aiohttp.AsyncResolver(loop=resolver_loop),
         use_dns_cache=True,
         ttl_dns_cache=config.REQUESTS_DNS_CACHE_TTL_SECONDS,
+        limit=config.LIMIT_REQUEST_CONCURRENCY,
+        limit_per_host=config.LIMIT_REQUEST_CONCURRENCY_PER_HOST,
         loop=resolver_loop,
     )
     headers = {"User-Agent": "telescope", **config.DEFAULT_REQUEST_HEADERS}
@@ -455,6 +1226,172 @@ async def run_parallel(*futures: Awaitable[T]) -> List[T]:
     return results
 
 
+class WorkQueue:
+    """
+    Share the batches of a check among the replicas connected to the same Redis.
+
+    The replica running the check publishes the batches of a job, and works on
+    them along with the other replicas. The partial results are merged in the
+    original order of the items. Without Redis, batches are processed locally.
+    """
+
+    def __init__(
+        self, batch_size: int = 50, timeout: float = 600, poll_interval: float = 1
+    ):
+        self.client: Optional[Redis] = None
+        self.prefix = "work:"
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.tasks: Dict[str, FunctionType] = {}
+
+    def connect(self, url: str, key_prefix: str):
+        """
+        Share the work through the specified Redis server, or locally if empty.
+        """
+        self.client = Redis.from_url(url) if url else None
+        self.prefix = f"{key_prefix}:work:"
+
+    def task(self, func: TaskFunction) -> TaskFunction:
+        """
+        Register a function that processes a batch of items, so that any replica
+        can run it. Items, parameters and results must be JSON serializable.
+        """
+        self.tasks[self._task_name(func)] = func
+        return func
+
+    @staticmethod
+    def _task_name(func: FunctionType) -> str:
+        return f"{func.__module__}.{func.__qualname__}"
+
+    @property
+    def _ttl(self) -> int:
+        # Keys of abandoned jobs expire eventually.
+        return max(1, math.ceil(self.timeout))
+
+    def _keys(self, job: str) -> Tuple[str, str, str]:
+        return (
+            f"{self.prefix}{job}:spec",
+            f"{self.prefix}{job}:batches",
+            f"{self.prefix}{job}:results",
+        )
+
+    async def map(self, func: FunctionType, items: List, **params) -> List:
+        """
+        Run the registered ``func`` on batches of ``items`` and return the
+        concatenation of their results.
+        """
+        name = self._task_name(func)
+        client = self.client
+        if client is None or not items or self.tasks.get(name) is not func:
+            return await func(items, **params)
+
+        job = secrets.token_hex(8)
+        spec_key, batches_key, results_key = self._keys(job)
+        batches = [
+            items[i : i + self.batch_size]
+            for i in range(0, len(items), self.batch_size)
+        ]
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.set(spec_key, json_dumps({"task": name, "params": params}))
+            payloads = [
+                json_dumps({"index": i, "items": batch})
+                for i, batch in enumerate(batches)
+            ]
+            pipe.rpush(batches_key, *payloads)
+            pipe.sadd(f"{self.prefix}jobs", job)
+            for key in (spec_key, batches_key):
+                pipe.expire(key, self._ttl)
+            await pipe.execute()
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        try:
+            # Work on our own job, and wait for the batches claimed by other replicas.
+            while await client.hlen(results_key) < len(batches):
+                if loop.time() > deadline:
+                    break
+                if not await self._work_on(client, job):
+                    await asyncio.sleep(self.poll_interval)
+            partials = await client.hgetall(results_key)
+        finally:
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.srem(f"{self.prefix}jobs", job)
+                pipe.delete(spec_key, batches_key, results_key)
+                await pipe.execute()
+
+        results = []
+        for i, batch in enumerate(batches):
+            partial = partials.get(str(i).encode())
+            if partial is None:
+                logger.warning(f"Batch {i} of {name} was not completed, run it locally")
+                results.extend(await func(batch, **params))
+            else:
+                results.extend(json.loads(partial))
+        return results
+
+    async def _work_on(self, client: Redis, job: str) -> bool:
+        """
+        Process one batch of the specified job, if any is left.
+        """
+        spec_key, batches_key, results_key = self._keys(job)
+        raw_spec = await client.get(spec_key)
+        if raw_spec is None:
+            # Job is over or expired.
+            await client.srem(f"{self.prefix}jobs", job)
+            return False
+        spec = json.loads(raw_spec)
+        func = self.tasks.get(spec["task"])
+        if func is None:
+            # This replica does not know this task (eg. different config).
+            return False
+        raw_batch = await client.lpop(batches_key)
+        if not isinstance(raw_batch, bytes):
+            # No batch left.
+            return False
+        batch = json.loads(raw_batch)
+        try:
+            result = await func(batch["items"], **spec["params"])
+        except Exception:
+            # Give the batch back, the replica running the check will retry it.
+            await client.rpush(batches_key, raw_batch)
+            raise
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.hset(results_key, str(batch["index"]), json_dumps(result))
+            pipe.expire(results_key, self._ttl)
+            await pipe.execute()
+        return True
+
+    async def work_forever(self):
+        """
+        Process the batches of the jobs published by the other replicas.
+        """
+        client = self.client
+        if client is None:
+            return
+        try:
+            while True:
+                worked = False
+                try:
+                    for job in await client.smembers(f"{self.prefix}jobs"):
+                        if isinstance(job, bytes):
+                            job = job.decode()
+                        worked = await self._work_on(client, job) or worked
+                except Exception as e:
+                    logger.exception(e)
+                if not worked:
+                    await asyncio.sleep(self.poll_interval)
+        except asyncio.CancelledError:
+            pass
+
+
+WORK_QUEUE = WorkQueue(
+    batch_size=config.WORK_QUEUE_BATCH_SIZE,
+    timeout=config.WORK_QUEUE_TIMEOUT_SECONDS,
+    poll_interval=config.WORK_QUEUE_POLL_INTERVAL_SECONDS,
+)
+
+
 def utcnow():
     # Tiny wrapper, used for mocking in tests.
     return datetime.now(timezone.utc)
@@ -615,6 +1552,11 @@ class BugTracker:
 
     def __init__(self, cache=None):
         self.cache = cache
+        # Bugs sorted for display, and indexed by check. These are rebuilt when
+        # the bug list is refreshed, and lookups don't require any lock.
+        self._bugs: List[Dict[str, Any]] = []
+        self._index: Dict[str, List[Dict[str, Any]]] = {}
+        self._index_expires = 0.0
 
     async def ping(self) -> bool:
         """
@@ -644,27 +1586,17 @@ class BugTracker:
         if not config.BUGTRACKER_URL:
             return []
 
-        cache_key = "bugtracker-list"
-        async with self.cache.lock(cache_key) if self.cache else DummyLock():
-            buglist = await self.cache.get(cache_key) if self.cache else None
+        if time.monotonic() >= self._index_expires:
+            await self._refresh()
 
-            if buglist is None:
-                # Fallback to an empty list when fetching fails. Caching this fallback value
-                # will prevent every check to fail because of the bugtracker.
-                default_buglist: Dict = {"bugs": []}
-                env_name = config.ENV_NAME or ""
-                url = f"{config.BUGTRACKER_URL}/rest/bug?whiteboard={config.SERVICE_NAME} {env_name}"
-                try:
-                    response = await fetch_json(
-                        url, headers={"X-BUGZILLA-API-KEY": config.BUGTRACKER_API_KEY}
-                    )
-                    buglist = response if "bugs" in response else default_buglist
-                except aiohttp.ClientError as e:
-                    logger.exception(e)
-                    buglist = default_buglist
-
-                if self.cache:
-                    await self.cache.set(cache_key, buglist, ttl=config.BUGTRACKER_TTL)
+        check = f"{project}/{name}"
+        try:
+            bugs = self._index[check]
+        except KeyError:
+            # First lookup of this check since the last refresh.
+            bugs = self._index[check] = [
+                b for b in self._bugs if check in b["whiteboard"]
+            ]
 
         def _heat(datestr):
             dt = utcfromisoformat(datestr)
@@ -675,7 +1607,6 @@ class BugTracker:
                 else ("cold" if age_hours > self.HEAT_COLD_MIN_HOURS else "")
             )
 
-        check = f"{project}/{name}"
         return [
             {
                 "id": r["id"],
@@ -687,14 +1618,47 @@ class BugTracker:
                 "heat": _heat(r["last_change_time"]),
                 "url": f"{config.BUGTRACKER_URL}/{r['id']}",
             }
-            for r in sorted(
-                # Show open bugs first, sorted by last changed descending.
+            for r in bugs
+        ]
+
+    async def _refresh(self):
+        """
+        Load the list of bugs from cache or from the bug tracker, and reset the index.
+        """
+        cache_key = "bugtracker-list"
+        async with self.cache.lock(cache_key) if self.cache else DummyLock():
+            if time.monotonic() < self._index_expires:
+                # Refreshed while we were waiting for the lock.
+                return
+
+            buglist = await self.cache.get(cache_key) if self.cache else None
+
+            if buglist is None:
+                # Fallback to an empty list when fetching fails. Caching this fallback value
+                # will prevent every check to fail because of the bugtracker.
+                default_buglist: Dict = {"bugs": []}
+                env_name = config.ENV_NAME or ""
+                url = f"{config.BUGTRACKER_URL}/rest/bug?whiteboard={config.SERVICE_NAME} {env_name}"
+                try:
+                    response = await fetch_json(
+                        url, headers={"X-BUGZILLA-API-KEY": config.BUGTRACKER_API_KEY}
+                    )
+                    buglist = response if "bugs" in response else default_buglist
+                except aiohttp.ClientError as e:
+                    logger.exception(e)
+                    buglist = default_buglist
+
+                if self.cache:
+                    await self.cache.set(cache_key, buglist, ttl=config.BUGTRACKER_TTL)
+
+            # Show open bugs first, sorted by last changed descending.
+            self._bugs = sorted(
                 buglist["bugs"],
                 key=lambda r: (r["is_open"], r["last_change_time"]),
                 reverse=True,
             )
-            if check in r["whiteboard"]
-        ]
+            self._index = {}
+            self._index_expires = time.monotonic() + config.BUGTRACKER_TTL
 
 
 class EventEmitter:
@@ -752,35 +1716,71 @@ class History:
     async def fetch(
         self, project, name
     ) -> Optional[List[Dict[str, Union[datetime, bool, float]]]]:
+        (history,) = await self.fetch_many([(project, name)])
+        return history
+
+    async def fetch_many(
+        self, checks: List[Tuple[str, str]]
+    ) -> List[Optional[List[Dict[str, Union[datetime, bool, float]]]]]:
+        """
+        Fetch the history of the specified ``(project, name)`` checks.
+        """
+        # The history of each check is stored separately, so that we only
+        # fetch and deserialize what we need from the cache.
+        check_cache_keys = [
+            f"scalar-history:{project}/{name}" for project, name in checks
+        ]
+        # This key marks that the history of all checks was fetched from BigQuery.
         cache_key = "scalar-history"
+        if self.cache:
+            *histories, refreshed = await self.cache.get_many(
+                check_cache_keys + [cache_key]
+            )
+            if refreshed is not None or all(h is not None for h in histories):
+                return [history or [] for history in histories]
+
         async with self.cache.lock(cache_key) if self.cache else DummyLock():
-            history = await self.cache.get(cache_key) if self.cache else None
-
-            if history is None:
-                rows = []
-                if config.HISTORY_DAYS > 0:
-                    try:
-                        query = self.QUERY.format(interval=config.HISTORY_DAYS)
-                        rows = await fetch_bigquery(query)
-                    except Exception as e:
-                        logger.exception(e)
-                        # Differentiate error fetching data from BigQuery and no data available for this check.
-                        return None
-
-                history = {}
-                for row in rows:
-                    history.setdefault(row.check, []).append(
-                        {
-                            "t": row.t,
-                            "success": row.success,
-                            "scalar": float(row.scalar),
-                        }
-                    )
+            if self.cache:
+                refreshed = await self.cache.get(cache_key)
+                if refreshed is not None:
+                    # Refreshed while we were waiting for the lock.
+                    histories = await self.cache.get_many(check_cache_keys)
+                    return [history or [] for history in histories]
+
+            rows = []
+            if config.HISTORY_DAYS > 0:
+                try:
+                    query = self.QUERY.format(interval=config.HISTORY_DAYS)
+                    rows = await fetch_bigquery(query)
+                except Exception as e:
+                    logger.exception(e)
+                    # Differentiate error fetching data from BigQuery and no data available for this check.
+                    return [None] * len(checks)
+
+            all_histories: Dict[str, List] = {}
+            for row in rows:
+                all_histories.setdefault(row.check, []).append(
+                    {
+                        "t": row.t,
+                        "success": row.success,
+                        "scalar": float(row.scalar),
+                    }
+                )
 
-                if self.cache:
-                    await self.cache.set(cache_key, history, ttl=config.HISTORY_TTL)
+            if self.cache:
+                # Store the marker first, so that it expires before the histories.
+                await self.cache.set(cache_key, True, ttl=config.HISTORY_TTL)
+                await self.cache.set_many(
+                    {
+                        f"scalar-history:{check}": entries
+                        for check, entries in all_histories.items()
+                    },
+                    ttl=config.HISTORY_TTL,
+                )
 
-        return history.get(f"{project}/{name}", [])
+            return [
+                all_histories.get(f"{project}/{name}", []) for project, name in checks
+            ]
 
     async def ping(self) -> bool:
         """
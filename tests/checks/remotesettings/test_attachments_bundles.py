@@ -1,7 +1,14 @@
 import io
+import struct
 import zipfile
 
-from checks.remotesettings.attachments_bundles import run
+from checks.remotesettings.attachments_bundles import (
+    EOCD_MAX_SIZE,
+    SuffixFile,
+    central_directory_offset,
+    fetch_bundle,
+    run,
+)
 
 
 COLLECTION_URL = "/buckets/{}/collections/{}"
@@ -184,3 +191,97 @@ async def test_negative(mock_aioresponses):
             "status": "outdated",
         },
     }
+
+
+def partial(content, start, end=None):
+    end = len(content) if end is None else end
+    return dict(
+        status=206,
+        body=content[start:end],
+        headers={"Content-Range": f"bytes {start}-{end - 1}/{len(content)}"},
+    )
+
+
+def test_suffix_file():
+    f = SuffixFile(size=6, suffix=b"abc")
+    assert f.readable() and f.seekable()
+
+    assert f.read() == b"\x00\x00\x00abc"
+    assert f.read() == b""
+    f.seek(-4, io.SEEK_END)
+    assert f.read(2) == b"\x00a"
+    f.seek(1, io.SEEK_CUR)
+    assert f.read() == b"c"
+
+
+def test_central_directory_offset():
+    eocd = struct.pack("<4s4H2LH", b"PK\x05\x06", 0, 0, 1, 1, 46, 42, 0)
+    zip64 = struct.pack("<4s4H2LH", b"PK\x05\x06", 0, 0, 1, 1, 46, 0xFFFFFFFF, 0)
+
+    assert central_directory_offset(b"abc" + eocd) == 42
+    assert central_directory_offset(b"abc" + zip64) is None
+    assert central_directory_offset(eocd[:10]) is None
+    assert central_directory_offset(b"abc") is None
+
+
+async def test_fetch_bundle_with_range_requests(mock_aioresponses):
+    url = "http://cdn/bundles/main--ok.zip"
+    content = build_zip()
+    mock_aioresponses.get(url, **partial(content, 0))
+
+    status, _, size, nfiles = await fetch_bundle(url)
+
+    assert (status, size, nfiles) == (206, len(content), 3)
+    [request] = [r for reqs in mock_aioresponses.requests.values() for r in reqs]
+    assert request.kwargs["headers"]["Range"] == f"bytes=-{EOCD_MAX_SIZE}"
+
+
+async def test_fetch_bundle_with_large_central_directory(mock_aioresponses):
+    url = "http://cdn/bundles/main--big.zip"
+    content = build_zip(num_files=3000)
+    tail_start = len(content) - EOCD_MAX_SIZE
+    offset = central_directory_offset(content)
+    assert offset is not None
+    assert offset < tail_start
+    mock_aioresponses.get(url, **partial(content, tail_start))
+    mock_aioresponses.get(url, **partial(content, offset, tail_start))
+
+    status, _, size, nfiles = await fetch_bundle(url)
+
+    assert (status, size, nfiles) == (206, len(content), 3000)
+    requests = [r for reqs in mock_aioresponses.requests.values() for r in reqs]
+    assert requests[1].kwargs["headers"]["Range"] == f"bytes={offset}-{tail_start - 1}"
+
+
+async def test_fetch_bundle_falls_back_to_full_download(mock_aioresponses):
+    url = "http://cdn/bundles/main--big.zip"
+    content = build_zip(num_files=3000)
+    tail_start = len(content) - EOCD_MAX_SIZE
+    mock_aioresponses.get(url, **partial(content, tail_start))
+    # Range of the central directory is ignored.
+    mock_aioresponses.get(url, body=content)
+    mock_aioresponses.get(url, body=content)
+
+    status, _, size, nfiles = await fetch_bundle(url)
+
+    assert (status, size, nfiles) == (200, len(content), 3000)
+
+
+async def test_fetch_bundle_unsatisfiable_range(mock_aioresponses):
+    url = "http://cdn/bundles/main--empty.zip"
+    mock_aioresponses.get(url, status=416)
+    mock_aioresponses.get(url, body=b"")
+
+    status, _, size, nfiles = await fetch_bundle(url)
+
+    assert (status, size, nfiles) == (200, 0, None)
+
+
+async def test_fetch_bundle_bad_zip_with_range_requests(mock_aioresponses):
+    url = "http://cdn/bundles/main--badzip.zip"
+    mock_aioresponses.get(url, **partial(b"boom", 0))
+    mock_aioresponses.get(url, body=b"boom")
+
+    status, _, size, nfiles = await fetch_bundle(url)
+
+    assert (status, size, nfiles) == (200, 4, None)
@@ -2,7 +2,8 @@ from unittest import mock
 
 import pytest
 
-from checks.remotesettings.attachments_integrity import run
+from checks.remotesettings import attachments_integrity
+from checks.remotesettings.attachments_integrity import VerifiedAttachmentsIndex, run
 
 
 CHANGESET_URL = "/buckets/{}/collections/{}/changeset"
@@ -54,7 +55,13 @@ async def test_positive(mock_aioresponses):
     status, data = await run(server_url)
 
     # assert status is True
-    assert data == {"bad": [], "checked": 2, "total": 2}
+    assert data == {
+        "bad": [],
+        "checked": 2,
+        "skipped": 0,
+        "attachments": 2,
+        "total": 2,
+    }
 
 
 async def test_negative(mock_aioresponses, no_sleep):
@@ -125,6 +132,8 @@ async def test_negative(mock_aioresponses, no_sleep):
             },
         ],
         "checked": 4,
+        "skipped": 0,
+        "attachments": 4,
         "total": 4,
     }
 
@@ -226,3 +235,101 @@ async def test_urls_slicing_by_size(mock_aioresponses):
     # Only the big file should be in the first 50% slice.
     assert len(calls) == 1
     assert calls[0][0][0]["location"] == "http://cdn/file-big.jpg"
+
+
+async def test_bigger_attachment_is_not_fully_downloaded(mock_aioresponses):
+    url = "http://cdn/file1.jpg"
+    mock_aioresponses.get(url, body=b"a" * 1000)
+
+    with mock.patch("telescope.utils.STREAM_CHUNK_SIZE", 10):
+        result = await attachments_integrity.test_attachment(
+            {"location": url, "size": 7, "hash": "abc"}
+        )
+
+    assert result == ({"url": url, "error": "size differ (>7)"}, False)
+
+
+async def test_verified_attachments_are_skipped(mock_aioresponses, tmp_path):
+    server_url = "http://fake.local/v1"
+    mock_aioresponses.get(
+        server_url + "/",
+        payload={"capabilities": {"attachments": {"base_url": "http://cdn/"}}},
+        repeat=True,
+    )
+    changes_url = server_url + CHANGESET_URL.format("monitor", "changes")
+    mock_aioresponses.get(
+        changes_url,
+        payload={
+            "changes": [
+                {"id": "abc", "bucket": "bid", "collection": "cid", "last_modified": 42}
+            ]
+        },
+        repeat=True,
+    )
+    attachment = {
+        "size": 5,
+        "hash": "ed968e840d10d2d313a870bc131a4e2c311d7ad09bdf32b3418147221f51a6e2",
+        "location": "file1.jpg",
+    }
+    records_url = server_url + CHANGESET_URL.format("bid", "cid") + "?_expected=42"
+    mock_aioresponses.get(
+        records_url,
+        payload={
+            "changes": [
+                {"id": "abc", "attachment": attachment},
+                {"id": "def", "attachment": attachment},
+                {"id": "ghi", "attachment": {**attachment, "location": "file2.jpg"}},
+            ]
+        },
+        repeat=True,
+    )
+    mock_aioresponses.get("http://cdn/file1.jpg", body=b"a" * 5, repeat=True)
+    mock_aioresponses.get("http://cdn/file2.jpg", body=b"b" * 5, repeat=True)
+    index_path = str(tmp_path / "index.sqlite")
+
+    status, data = await run(server_url, index_path=index_path)
+
+    assert status is False
+    assert data["checked"] == 2
+    assert data["skipped"] == 0
+    assert data["attachments"] == 2
+    assert data["total"] == 3
+
+    status, data = await run(server_url, index_path=index_path)
+
+    assert status is False
+    assert data["checked"] == 1
+    assert data["skipped"] == 1
+    assert data["bad"][0]["url"] == "http://cdn/file2.jpg"
+
+    status, data = await run(server_url, index_path=index_path, index_max_age_hours=0)
+
+    assert data["checked"] == 2
+    assert data["skipped"] == 0
+    [(_, requests)] = [
+        (url, r) for url, r in mock_aioresponses.requests.items() if "file1" in str(url)
+    ]
+    assert len(requests) == 2
+
+
+async def test_index_spreads_expiry(tmp_path):
+    index = VerifiedAttachmentsIndex(str(tmp_path / "index.sqlite"))
+    with mock.patch.object(
+        attachments_integrity.random, "uniform", side_effect=[0.5, 1.0]
+    ):
+        await index.add([("a", "h", 1), ("b", "h", 2)], timestamp=1000)
+
+    assert await index.verified(now=1050, max_age=100) == {("a", "h", 1), ("b", "h", 2)}
+    # Verifications expire at different moments.
+    assert await index.verified(now=1075, max_age=100) == {("b", "h", 2)}
+    assert await index.verified(now=1101, max_age=100) == set()
+
+
+async def test_index_prune(tmp_path):
+    index = VerifiedAttachmentsIndex(str(tmp_path / "index.sqlite"))
+    await index.add([("a", "h", 1)], timestamp=1000)
+    await index.add([("b", "h", 2)], timestamp=2000)
+
+    await index.prune(before=1500)
+
+    assert await index.verified(now=2000, max_age=10_000) == {("b", "h", 2)}
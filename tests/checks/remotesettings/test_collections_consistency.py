@@ -1,6 +1,12 @@
 from unittest import mock
 
-from checks.remotesettings.collections_consistency import has_inconsistencies, run
+import pytest
+
+from checks.remotesettings.collections_consistency import (
+    consistent_states,
+    has_inconsistencies,
+    run,
+)
 
 
 FAKE_AUTH = "Bearer abc"
@@ -218,6 +224,79 @@ async def test_has_inconsistencies_destination_differs(mock_aioresponses):
     assert "1 record present in destination but missing in preview ('xyz')" in result
 
 
+@pytest.fixture
+def clear_consistent_states():
+    consistent_states.clear()
+    yield
+    consistent_states.clear()
+
+
+async def test_has_inconsistencies_skips_unchanged_collections(
+    mock_aioresponses, clear_consistent_states
+):
+    server_url = "http://fake.local/v1"
+    resource = {
+        **RESOURCES[0],
+        "last_modified": 42,
+        "preview_last_modified": 42,
+    }
+    records = [{"id": "abc", "last_modified": 42}]
+    collection_url = server_url + COLLECTION_URL.format("blog-workspace", "articles")
+    metadata = {"id": "articles", "status": "signed", "last_modified": 40}
+    mock_aioresponses.get(collection_url, payload={"data": metadata}, repeat=True)
+    for bid in ("blog-workspace", "blog-preview", "blog"):
+        mock_aioresponses.get(
+            server_url + RECORDS_URL.format(bid, "articles"),
+            payload={"data": records},
+            repeat=True,
+        )
+
+    assert await has_inconsistencies(server_url, FAKE_AUTH, resource) is None
+    assert await has_inconsistencies(server_url, FAKE_AUTH, resource) is None
+    # Compared again once the destination changed.
+    changed = {**resource, "last_modified": 43}
+    assert await has_inconsistencies(server_url, FAKE_AUTH, changed) is None
+
+    requests = {
+        str(url): len(calls) for (_, url), calls in mock_aioresponses.requests.items()
+    }
+    assert requests[collection_url] == 3
+    assert requests[server_url + RECORDS_URL.format("blog", "articles")] == 2
+
+
+async def test_has_inconsistencies_compares_inconsistent_collections_again(
+    mock_aioresponses, clear_consistent_states
+):
+    server_url = "http://fake.local/v1"
+    resource = {**RESOURCES[1], "last_modified": 42}
+    collection_url = server_url + COLLECTION_URL.format(
+        "security-workspace", "blocklist"
+    )
+    metadata = {"id": "blocklist", "status": "signed", "last_modified": 40}
+    mock_aioresponses.get(collection_url, payload={"data": metadata}, repeat=True)
+    mock_aioresponses.get(
+        server_url + RECORDS_URL.format("security-workspace", "blocklist"),
+        payload={"data": [{"id": "abc", "last_modified": 42}]},
+        repeat=True,
+    )
+    mock_aioresponses.get(
+        server_url + RECORDS_URL.format("security", "blocklist"),
+        payload={"data": []},
+        repeat=True,
+    )
+
+    assert await has_inconsistencies(server_url, FAKE_AUTH, resource)
+    assert await has_inconsistencies(server_url, FAKE_AUTH, resource)
+
+    assert not consistent_states
+    [calls] = [
+        calls
+        for (_, url), calls in mock_aioresponses.requests.items()
+        if str(url).endswith("/buckets/security/collections/blocklist/records")
+    ]
+    assert len(calls) == 2
+
+
 async def test_fails_if_source_collection_missing_in_monitored_changes(
     mock_aioresponses,
 ):
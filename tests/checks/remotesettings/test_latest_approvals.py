@@ -68,9 +68,21 @@ async def test_get_latest_approvals(mock_aioresponses):
         history_url + query_params,
         payload={
             "data": [
-                {"id": "r1", "action": "delete"},
-                {"id": "r2", "action": "create"},
-                {"id": "r3", "action": "create"},
+                {
+                    "id": "r1",
+                    "action": "delete",
+                    "target": {"data": {"last_modified": 11}},
+                },
+                {
+                    "id": "r2",
+                    "action": "create",
+                    "target": {"data": {"last_modified": 12}},
+                },
+                {
+                    "id": "r3",
+                    "action": "create",
+                    "target": {"data": {"last_modified": 13}},
+                },
             ]
         },
     )
@@ -83,6 +95,70 @@ async def test_get_latest_approvals(mock_aioresponses):
     assert infos == INFOS
 
 
+async def test_get_latest_approvals_counts_changes_between_approvals(
+    mock_aioresponses,
+):
+    server_url = "http://fake.local/v1"
+    history_url = server_url + HISTORY_URL.format("bid")
+    approvals = [
+        {"last_modified": ts, "date": f"2019-09-0{i}", "user_id": f"user{i}"}
+        for i, ts in enumerate([3000, 2000, 1000], start=1)
+    ]
+    mock_aioresponses.get(history_url, payload={"data": approvals})
+    changes = [
+        {"action": action, "target": {"data": {"last_modified": ts}}}
+        for action, ts in [
+            ("update", 2999),
+            ("create", 2500),
+            ("delete", 2000),  # Not strictly between approvals.
+            ("create", 1500),
+            ("update", 1001),
+        ]
+    ]
+    mock_aioresponses.get(history_url, payload={"data": changes})
+    client = KintoClient(server_url=server_url)
+
+    infos = await get_latest_approvals(
+        client, "bid", "cid", max_approvals=2, min_timestamp=42
+    )
+
+    assert infos == [
+        {
+            "timestamp": 3000,
+            "datetime": "2019-09-01",
+            "by": "user1",
+            "changes": {"update": 1, "create": 1},
+        },
+        {
+            "timestamp": 2000,
+            "datetime": "2019-09-02",
+            "by": "user2",
+            "changes": {"create": 1, "update": 1},
+        },
+    ]
+    # A single query is sent for the changes of all approvals.
+    [(_, changes_url)] = [
+        key
+        for key in mock_aioresponses.requests
+        if "resource_name=record" in str(key[1])
+    ]
+    assert "_since=1000" in str(changes_url)
+    assert "_before=4000" in str(changes_url)
+
+
+async def test_get_latest_approvals_without_approvals(mock_aioresponses):
+    server_url = "http://fake.local/v1"
+    history_url = server_url + HISTORY_URL.format("bid")
+    mock_aioresponses.get(history_url, payload={"data": []})
+    client = KintoClient(server_url=server_url)
+
+    infos = await get_latest_approvals(
+        client, "bid", "cid", max_approvals=2, min_timestamp=42
+    )
+
+    assert infos == []
+
+
 async def test_positive(mock_aioresponses):
     server_url = "http://fake.local/v1"
     module = "checks.remotesettings.latest_approvals"
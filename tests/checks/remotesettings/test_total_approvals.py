@@ -21,9 +21,9 @@ async def test_get_approvals(mock_aioresponses):
         history_url + query_params,
         payload={
             "data": [
-                {"id": "abc", "collection_id": "cid"},
-                {"id": "efg", "collection_id": "cfr"},
-                {"id": "hij", "collection_id": "cfr"},
+                {"id": "abc", "collection_id": "cid", "last_modified": 50},
+                {"id": "efg", "collection_id": "cfr", "last_modified": 45},
+                {"id": "hij", "collection_id": "cfr", "last_modified": 86400043},
             ]
         },
     )
@@ -32,8 +32,9 @@ async def test_get_approvals(mock_aioresponses):
     infos = await get_approvals(client, "bid", min_timestamp=42, max_timestamp=52)
 
     assert infos == {
-        "cid": 1,
-        "cfr": 2,
+        ("1970-01-01", "cid"): 1,
+        ("1970-01-01", "cfr"): 1,
+        ("1970-01-02", "cfr"): 1,
     }
 
 
@@ -47,13 +48,20 @@ async def test_positive(mock_aioresponses):
         }
     ]
     totals = {
-        "cid": 10,
-        "cfr": 5,
+        ("1982-05-07", "cid"): 10,
+        ("1982-05-07", "cfr"): 5,
+        ("1982-05-06", "cfr"): 3,
     }
     with mock.patch(f"{module}.utcnow", return_value=datetime(1982, 5, 8)):
         with mock.patch(f"{module}.fetch_signed_resources", return_value=resources):
-            with mock.patch(f"{module}.get_approvals", return_value=totals):
-                status, data = await run(server_url, FAKE_AUTH, period_days=1)
+            with mock.patch(f"{module}.get_approvals", return_value=totals) as mocked:
+                status, data = await run(server_url, FAKE_AUTH, period_days=3)
 
     assert status is True
-    assert data == [{"date": "1982-05-07", "totals": 15, "bid/cid": 10, "bid/cfr": 5}]
+    # The whole period is fetched at once.
+    mocked.assert_called_once()
+    assert data == [
+        {"date": "1982-05-07", "totals": 15, "bid/cid": 10, "bid/cfr": 5},
+        {"date": "1982-05-06", "totals": 3, "bid/cfr": 3},
+        {"date": "1982-05-05", "totals": 0},
+    ]
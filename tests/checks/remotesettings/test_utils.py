@@ -1,11 +1,25 @@
+import asyncio
+
+import aiohttp
 import pytest
 
-from checks.remotesettings.utils import KintoClient, fetch_signed_resources
+from checks.remotesettings.utils import (
+    KintoClient,
+    changesets_store,
+    collection_diff,
+    fetch_server_info,
+    fetch_signed_resources,
+    records_equal,
+)
 
 
 async def test_fetch_signed_resources_no_signer(mock_aioresponses):
     server_url = "http://fake.local/v1"
     mock_aioresponses.get(server_url + "/", payload={"capabilities": {}})
+    mock_aioresponses.get(
+        server_url + "/buckets/monitor/collections/changes/changeset",
+        payload={"timestamp": 42, "changes": []},
+    )
 
     with pytest.raises(ValueError):
         await fetch_signed_resources(server_url, auth="Bearer abc")
@@ -75,6 +89,7 @@ async def test_fetch_signed_resources(mock_aioresponses):
     assert resources == [
         {
             "last_modified": 42,
+            "preview_last_modified": 40,
             "source": {"bucket": "blog-workspace", "collection": "articles"},
             "preview": {"bucket": "blog-preview", "collection": "articles"},
             "destination": {"bucket": "blog", "collection": "articles"},
@@ -111,6 +126,131 @@ async def test_fetch_signed_resources_unknown_collection(mock_aioresponses):
         await fetch_signed_resources(server_url, auth="Bearer abc")
 
 
+async def test_fetch_signed_resources_is_cached_until_monitor_changes(
+    mock_aioresponses,
+):
+    server_url = "http://fake.local/v1"
+    info = {
+        "capabilities": {
+            "attachments": {"base_url": "http://cdn/"},
+            "signer": {
+                "resources": [
+                    {
+                        "source": {"bucket": "main-workspace", "collection": None},
+                        "destination": {"bucket": "main", "collection": None},
+                    }
+                ]
+            },
+        }
+    }
+    mock_aioresponses.get(server_url + "/", payload=info)
+    mock_aioresponses.get(server_url + "/", payload=info)
+    mock_aioresponses.get(
+        server_url + "/buckets/main-workspace/collections",
+        payload={"data": [{"id": "cid"}]},
+        repeat=True,
+    )
+    changes_url = server_url + "/buckets/monitor/collections/changes/changeset"
+    entry = {"id": "a", "bucket": "main", "collection": "cid", "last_modified": 42}
+    for timestamp in (42, 42, 43):
+        mock_aioresponses.get(
+            changes_url, payload={"timestamp": timestamp, "changes": [entry]}
+        )
+
+    first = await fetch_signed_resources(server_url, auth="Bearer abc")
+    first[0]["source"]["collection"] = "mutated"
+    second = await fetch_signed_resources(server_url, auth="Bearer abc")
+    assert await fetch_server_info(server_url, auth="Bearer abc") == info
+    third = await fetch_signed_resources(server_url, auth="Bearer abc")
+
+    assert second == third
+    assert second[0]["source"] == {"bucket": "main-workspace", "collection": "cid"}
+    [info_calls] = [
+        calls
+        for (_, url), calls in mock_aioresponses.requests.items()
+        if str(url) == server_url + "/"
+    ]
+    assert len(info_calls) == 2
+
+
+async def test_fetch_server_info_without_cache(mock_aioresponses):
+    server_url = "http://fake.local/v1"
+    mock_aioresponses.get(server_url + "/", payload={"project_name": "kinto"})
+
+    assert await fetch_server_info(server_url) == {"project_name": "kinto"}
+
+
+async def test_get_records_follows_pagination(mock_aioresponses):
+    server_url = "http://fake.local/v1"
+    records_url = server_url + "/buckets/bid/collections/cid/records"
+    mock_aioresponses.get(
+        records_url,
+        payload={"data": [{"id": "a"}, {"id": "b"}]},
+        headers={"Next-Page": records_url + "?_limit=2&_token=xyz"},
+    )
+    mock_aioresponses.get(records_url, payload={"data": [{"id": "c"}]})
+    client = KintoClient(server_url=server_url)
+
+    records = await client.get_records(
+        bucket="bid", collection="cid", params={"_limit": 2}
+    )
+
+    assert records == [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+    queries = [
+        request.kwargs.get("query") or {}
+        for requests in mock_aioresponses.requests.values()
+        for request in requests
+    ]
+    assert sorted(q.get("_token", [""])[0] for q in queries) == ["", "xyz"]
+
+
+async def test_iter_history_prefetches_next_page(mock_aioresponses):
+    server_url = "http://fake.local/v1"
+    history_url = server_url + "/buckets/bid/history"
+    mock_aioresponses.get(
+        history_url,
+        payload={"data": [{"id": "a"}]},
+        headers={"Next-Page": history_url + "?_token=1"},
+    )
+    mock_aioresponses.get(
+        history_url,
+        payload={"data": [{"id": "b"}]},
+        headers={"Next-Page": history_url + "?_token=2"},
+    )
+    mock_aioresponses.get(history_url, payload={"data": [{"id": "c"}]})
+    client = KintoClient(server_url=server_url)
+
+    entries = client.iter_history(bucket="bid")
+    assert await anext(entries) == {"id": "a"}
+    # The second page is fetched while the first one is consumed.
+    for _ in range(100):
+        requests = [r for reqs in mock_aioresponses.requests.values() for r in reqs]
+        if len(requests) == 2:
+            break
+        await asyncio.sleep(0.01)
+    assert len(requests) == 2
+    assert await anext(entries) == {"id": "b"}
+    # Stop before the third page is read.
+    await entries.aclose()
+
+
+async def test_get_history_stops_after_max_objects(mock_aioresponses):
+    server_url = "http://fake.local/v1"
+    history_url = server_url + "/buckets/bid/history"
+    mock_aioresponses.get(
+        history_url,
+        payload={"data": [{"id": "a"}, {"id": "b"}]},
+        headers={"Next-Page": history_url + "?_token=1"},
+    )
+    client = KintoClient(server_url=server_url)
+
+    entries = await client.get_history(bucket="bid", max_objects=1)
+
+    assert entries == [{"id": "a"}]
+    # The next page is not fetched.
+    assert len([r for reqs in mock_aioresponses.requests.values() for r in reqs]) == 1
+
+
 async def test_kinto_client_auth_bearer_header(mock_aioresponses):
     server_url = "http://fake.local/v1"
     mock_aioresponses.get(server_url + "/", payload={})
@@ -162,4 +302,183 @@ async def test_get_monitor_changes(mock_aioresponses):
 
     assert request1.kwargs["query"]["_expected"] == ["0"]
     assert "_expected" in request2.kwargs["query"]
+    assert request2.kwargs["headers"]["Cache-Control"] == "no-store"
+    assert "Cache-Control" not in request1.kwargs["headers"]
     assert request3.kwargs["query"]["_expected"] == ["bim"]
+
+
+async def test_get_changeset_is_shared(mock_aioresponses):
+    server_url = "http://fake.local/v1"
+    changeset_url = f"{server_url}/buckets/bid/collections/cid/changeset"
+    mock_aioresponses.get(changeset_url, payload={"timestamp": 42, "changes": []})
+
+    client = KintoClient(server_url=server_url)
+    other_client = KintoClient(server_url=server_url)
+    results = await asyncio.gather(
+        client.get_changeset(bucket="bid", collection="cid", params={"_expected": 42}),
+        client.get_changeset(bucket="bid", collection="cid", params={"_expected": 42}),
+    )
+    changeset = await other_client.get_changeset(
+        bucket="bid", collection="cid", params={"_expected": "42"}
+    )
+
+    assert results[0] is results[1] is changeset
+    [(_, requests)] = mock_aioresponses.requests.items()
+    assert len(requests) == 1
+
+
+async def test_get_changeset_keeps_latest_version(mock_aioresponses):
+    server_url = "http://fake.local/v1"
+    changeset_url = f"{server_url}/buckets/bid/collections/cid/changeset"
+    mock_aioresponses.get(changeset_url, payload={"timestamp": 42, "changes": []})
+    mock_aioresponses.get(changeset_url, payload={"timestamp": 43, "changes": []})
+
+    client = KintoClient(server_url=server_url)
+    await client.get_changeset(bucket="bid", collection="cid", params={"_expected": 42})
+    await client.get_changeset(bucket="bid", collection="cid", params={"_expected": 43})
+    changeset = await client.get_changeset(
+        bucket="bid", collection="cid", params={"_expected": 43}
+    )
+
+    assert changeset["timestamp"] == 43
+    assert len(changesets_store._changesets) == 1
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"params": {"_expected": 42}, "headers": {"Accept": "*/*"}},
+        {"params": {"_expected": 41}},
+        {"bust_cache": True},
+    ],
+    ids=["headers", "stale", "bust_cache"],
+)
+async def test_get_changeset_is_not_shared(mock_aioresponses, kwargs):
+    server_url = "http://fake.local/v1"
+    changeset_url = f"{server_url}/buckets/bid/collections/cid/changeset"
+    mock_aioresponses.get(
+        changeset_url, payload={"timestamp": 42, "changes": []}, repeat=True
+    )
+
+    client = KintoClient(server_url=server_url)
+    await client.get_changeset(bucket="bid", collection="cid", **kwargs)
+    await client.get_changeset(bucket="bid", collection="cid", **kwargs)
+
+    assert sum(len(r) for r in mock_aioresponses.requests.values()) == 2
+    assert not changesets_store._changesets
+
+
+async def test_get_changeset_errors_are_not_shared(mock_aioresponses, no_sleep):
+    server_url = "http://fake.local/v1"
+    changeset_url = f"{server_url}/buckets/bid/collections/cid/changeset"
+    mock_aioresponses.get(changeset_url, status=500, repeat=True)
+    client = KintoClient(server_url=server_url)
+
+    with pytest.raises(aiohttp.ClientResponseError):
+        await client.get_changeset(
+            bucket="bid", collection="cid", params={"_expected": 42}
+        )
+
+    assert not changesets_store._changesets
+    assert not changesets_store._inflight
+
+
+async def test_get_changeset_downloads_changes_since_kept_version(mock_aioresponses):
+    server_url = "http://fake.local/v1"
+    changeset_url = f"{server_url}/buckets/bid/collections/cid/changeset"
+    mock_aioresponses.get(
+        changeset_url,
+        payload={
+            "timestamp": 42,
+            "metadata": {"signature": "a"},
+            "changes": [
+                {"id": "r2", "last_modified": 42},
+                {"id": "r1", "last_modified": 41},
+            ],
+        },
+    )
+    mock_aioresponses.get(
+        changeset_url,
+        payload={
+            "timestamp": 44,
+            "metadata": {"signature": "b"},
+            "changes": [
+                {"id": "r3", "last_modified": 44},
+                {"id": "r1", "last_modified": 43, "deleted": True},
+            ],
+        },
+    )
+
+    client = KintoClient(server_url=server_url)
+    await client.get_changeset(bucket="bid", collection="cid", params={"_expected": 42})
+    changeset = await client.get_changeset(
+        bucket="bid", collection="cid", params={"_expected": 44}
+    )
+
+    assert changeset == {
+        "timestamp": 44,
+        "metadata": {"signature": "b"},
+        "changes": [
+            {"id": "r3", "last_modified": 44},
+            {"id": "r2", "last_modified": 42},
+        ],
+    }
+    request1, request2 = [r for rs in mock_aioresponses.requests.values() for r in rs]
+    assert "_since" not in request1.kwargs["query"]
+    assert request2.kwargs["query"]["_since"] == ["42"]
+
+
+async def test_get_changeset_downloads_older_versions_fully(mock_aioresponses):
+    server_url = "http://fake.local/v1"
+    changeset_url = f"{server_url}/buckets/bid/collections/cid/changeset"
+    mock_aioresponses.get(changeset_url, payload={"timestamp": 42, "changes": []})
+    mock_aioresponses.get(changeset_url, payload={"timestamp": 41, "changes": []})
+
+    client = KintoClient(server_url=server_url)
+    await client.get_changeset(bucket="bid", collection="cid", params={"_expected": 42})
+    await client.get_changeset(bucket="bid", collection="cid", params={"_expected": 41})
+
+    _, request = [r for rs in mock_aioresponses.requests.values() for r in rs]
+    assert "_since" not in request.kwargs["query"]
+
+
+def test_records_equal():
+    assert records_equal(
+        {"id": "a", "meta": {"x": 1, "y": 2}, "last_modified": 1, "schema": 1},
+        {"id": "a", "meta": {"y": 2, "x": 1}, "last_modified": 2},
+    )
+    assert not records_equal({"id": "a", "title": "a"}, {"id": "a", "title": "b"})
+
+
+def test_collection_diff_keeps_records_order():
+    src = [
+        {"id": "e", "last_modified": 6},
+        {"id": "b", "title": "new", "last_modified": 5},
+        {"id": "d", "last_modified": 4},
+        {"id": "a", "title": "new", "last_modified": 3},
+        {"id": "c", "last_modified": 2},
+    ]
+    dest = [
+        {"id": "g", "last_modified": 4},
+        {"id": "a", "title": "old", "last_modified": 3},
+        {"id": "c", "last_modified": 1},
+        {"id": "f", "last_modified": 2},
+        {"id": "b", "title": "old", "last_modified": 1},
+    ]
+
+    to_create, to_update, to_delete = collection_diff(src, dest)
+
+    assert [r["id"] for r in to_create] == ["e", "d"]
+    assert to_update == [
+        ({"id": "b", "title": "old", "last_modified": 1}, {"id": "b", "title": "new"}),
+        ({"id": "a", "title": "old", "last_modified": 3}, {"id": "a", "title": "new"}),
+    ]
+    assert [r["id"] for r in to_delete] == ["g", "f"]
+    # Compared records are left untouched.
+    assert src[1] == {"id": "b", "title": "new", "last_modified": 5}
+
+
+def test_collection_diff_identical():
+    records = [{"id": str(i), "last_modified": i} for i in range(10)]
+
+    assert collection_diff(records, list(reversed(records))) == ([], [], [])
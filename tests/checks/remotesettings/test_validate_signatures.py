@@ -1,9 +1,15 @@
+import asyncio
 from unittest import mock
 
 import pytest
 from aiohttp import ClientResponseError
+from autograph_utils import BadSignature
 
-from checks.remotesettings.validate_signatures import run, validate_signature
+from checks.remotesettings.validate_signatures import (
+    canonical_payload,
+    run,
+    validate_signature,
+)
 
 
 MODULE = "checks.remotesettings.validate_signatures"
@@ -33,6 +39,14 @@ qvRy6gQ1oC/z
 # spellchecker:on
 
 
+def test_canonical_payload():
+    records = [{"id": "b", "title": "é"}, {"id": "a"}]
+
+    assert canonical_payload(records, 42) == (
+        '{"data":[{"id":"a"},{"id":"b","title":"\\u00e9"}],"last_modified":"42"}'
+    ).encode("utf-8")
+
+
 async def test_positive(mock_aioresponses):
     server_url = "http://fake.local/v1"
     changes_url = server_url + CHANGESET_URL.format("monitor", "changes")
@@ -93,6 +107,45 @@ async def test_negative(mock_aioresponses):
     }
 
 
+async def test_verifications_are_concurrent_and_bounded(mock_aioresponses):
+    server_url = "http://fake.local/v1"
+    changes_url = server_url + CHANGESET_URL.format("monitor", "changes")
+    cids = ["cid1", "cid2", "cid3", "cid4", "cid5"]
+    mock_aioresponses.get(
+        changes_url,
+        payload={
+            "changes": [
+                {"id": cid, "bucket": "bid", "collection": cid, "last_modified": 42}
+                for cid in cids
+            ]
+        },
+    )
+    for cid in cids:
+        mock_aioresponses.get(
+            server_url + CHANGESET_URL.format("bid", cid),
+            payload={"metadata": {"cid": cid}, "changes": [], "timestamp": 42},
+        )
+
+    running = []
+    max_running = 0
+
+    async def fake_validate(verifier, metadata, records, timestamp):
+        nonlocal max_running
+        running.append(None)
+        max_running = max(max_running, len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+        if metadata["cid"] in ("cid2", "cid5"):
+            raise BadSignature()
+
+    with mock.patch(f"{MODULE}.validate_signature", side_effect=fake_validate):
+        status, data = await run(server_url, ["bid"], max_concurrent_verifications=2)
+
+    assert max_running == 2
+    assert status is False
+    assert list(data.keys()) == ["bid/cid2", "bid/cid5"]
+
+
 async def test_root_hash_is_decoded_if_specified(mock_aioresponses):
     server_url = "http://fake.local/v1"
     changes_url = server_url + CHANGESET_URL.format("monitor", "changes")
@@ -6,6 +6,7 @@ from urllib.parse import urlsplit, urlunsplit
 import pytest
 from aiointercept import aiointercept
 
+from checks.remotesettings.utils import changesets_store, signed_resources_cache
 from telescope import config as global_config
 from telescope import utils
 from telescope.app import Checks, init_app
@@ -33,6 +34,13 @@ async def http_session():
         yield
 
 
+@pytest.fixture(autouse=True)
+def clear_changesets_store():
+    # Changesets are shared by checks of the same process.
+    changesets_store.clear()
+    signed_resources_cache.clear()
+
+
 @pytest.fixture
 def test_config_toml():
     config_file = os.path.join(HERE, "config.toml")
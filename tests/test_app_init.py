@@ -3,6 +3,7 @@ from unittest import mock
 import pytest
 
 from telescope.app import Checks, init_app
+from telescope.utils import HTTP_CACHE, WORK_QUEUE, TieredCache
 
 
 async def test_sentry_setup(cli):
@@ -48,6 +49,18 @@ async def test_app_init_advanced_parameters():
     )
 
 
+async def test_app_init_tiered_cache(config):
+    config.REDIS_CACHE_URL = "redis://localhost:6379/0"
+    config.CACHE_L1_MAX_ENTRIES = 100
+
+    app = init_app(Checks([]))
+
+    cache = app["telescope.cache"]
+    assert isinstance(cache, TieredCache)
+    assert cache.metric is not None
+    assert cache.invalidation_context in app.cleanup_ctx
+
+
 def test_unknown_configuration_parameter():
     with pytest.raises(ValueError):
         init_app(
@@ -65,3 +78,25 @@ def test_unknown_configuration_parameter():
                 }
             )
         )
+
+
+async def test_app_init_http_cache(config):
+    config.HTTP_CACHE_ENABLED = True
+    app = init_app(Checks([]))
+    assert HTTP_CACHE.cache is app["telescope.cache"]
+
+    config.HTTP_CACHE_ENABLED = False
+    init_app(Checks([]))
+    assert HTTP_CACHE.cache is None
+
+
+async def test_app_init_work_queue(config):
+    config.REDIS_CACHE_URL = "redis://localhost:6379/0"
+    config.WORK_QUEUE_ENABLED = True
+    init_app(Checks([]))
+    assert WORK_QUEUE.client is not None
+    assert WORK_QUEUE.prefix == f"{config.REDIS_KEY_PREFIX}:work:"
+
+    config.WORK_QUEUE_ENABLED = False
+    init_app(Checks([]))
+    assert WORK_QUEUE.client is None
@@ -1,14 +1,19 @@
+import asyncio
+import json
 import logging
 import re
 import tempfile
 import time
+from datetime import timedelta
 from operator import itemgetter
 from unittest import mock
 
+import pytest
 from aiointercept import CallbackResult
 
 from telescope import config
-from telescope.utils import run_parallel
+from telescope.app import _background_refreshes
+from telescope.utils import run_parallel, utcnow
 
 
 async def test_hello(cli):
@@ -323,6 +328,79 @@ async def test_check_force_refresh(cli, mock_aioresponses):
     assert dt_before != dt_refreshed
 
 
+async def test_check_exposes_result_age(cli):
+    response = await cli.get("/checks/testproject/fake")
+    body = await response.json()
+    assert body["age"] == 0
+
+
+async def test_checks_results_are_fetched_from_cache_at_once(cli):
+    await cli.get("/checks/testproject")
+    cache = cli.app["telescope.cache"]
+
+    with mock.patch.object(cache, "get_many", wraps=cache.get_many) as mocked:
+        with mock.patch("telescope.app.Check.run") as mocked_run:
+            await cli.get("/checks/testproject")
+
+    checks = cli.app["telescope.checks"].lookup(project="testproject")
+    mocked.assert_any_call([check.cache_key for check in checks])
+    mocked_run.assert_not_called()
+
+
+async def test_check_serves_stale_result_and_refreshes(cli, config):
+    config.CACHE_STALE_TTL_SECONDS = 60
+    cache = cli.app["telescope.cache"]
+    [check] = cli.app["telescope.checks"].lookup(project="testproject", name="fake")
+    stale_dt = (utcnow() - timedelta(seconds=check.ttl + 10)).isoformat()
+    await cache.set(check.cache_key, (stale_dt, True, "stale", 0.1), ttl=100)
+
+    resp = await cli.get("/checks/testproject/fake")
+    body = await resp.json()
+    assert body["data"] == "stale"
+    assert body["age"] >= check.ttl + 10
+
+    await asyncio.gather(*_background_refreshes.values())
+
+    resp = await cli.get("/checks/testproject/fake")
+    body = await resp.json()
+    assert body["data"] == {"max_age": 999, "from_conf": 100}
+    assert body["age"] == 0
+    assert not _background_refreshes
+
+
+async def test_check_stale_result_is_refreshed_once(cli, config):
+    config.CACHE_STALE_TTL_SECONDS = 60
+    cache = cli.app["telescope.cache"]
+    [check] = cli.app["telescope.checks"].lookup(project="testproject", name="fake")
+    stale_dt = (utcnow() - timedelta(seconds=check.ttl + 10)).isoformat()
+    await cache.set(check.cache_key, (stale_dt, True, "stale", 0.1), ttl=100)
+
+    with mock.patch.object(check, "_execute", new_callable=mock.AsyncMock) as mocked:
+        await check.run(cache=cache)
+        await check.run(cache=cache)
+        await asyncio.gather(*_background_refreshes.values())
+
+    assert mocked.call_count == 1
+
+
+async def test_check_stale_refresh_failure_is_logged(cli, config, caplog):
+    config.CACHE_STALE_TTL_SECONDS = 60
+    cache = cli.app["telescope.cache"]
+    [check] = cli.app["telescope.checks"].lookup(project="testproject", name="fake")
+    stale_dt = (utcnow() - timedelta(seconds=check.ttl + 10)).isoformat()
+    await cache.set(check.cache_key, (stale_dt, True, "stale", 0.1), ttl=100)
+
+    with mock.patch.object(check, "func", side_effect=ValueError("boom")):
+        await check.run(cache=cache)
+        task = _background_refreshes[check.cache_key]
+        with pytest.raises(ValueError):
+            await task
+    await asyncio.sleep(0)  # Let the done callback run.
+
+    assert "Background refresh of testproject/fake failed" in caplog.text
+    assert not _background_refreshes
+
+
 async def test_check_cached_by_queryparam(cli, mock_aioresponses):
     resp = await cli.get("/checks/testproject/fake")
     dt_no_params = (await resp.json())["datetime"]
@@ -365,24 +443,85 @@ async def test_sends_events(mock_aioresponses, cli):
     assert len(events["check:run"]) == 2
     assert len(events["check:state:changed"]) == 1
 
-    assert list(map(itemgetter("result"), events["check:run"])) == [
-        {
-            "data": {"ok": True},
-            "success": True,
-        },
-        {
-            "data": {"ok": False},
-            "success": False,
-        },
+    results = list(map(itemgetter("result"), events["check:run"]))
+    assert all(
+        set(r.keys()) == {"datetime", "duration", "data", "success"} for r in results
+    )
+    assert [(r["success"], r["data"]) for r in results] == [
+        (True, {"ok": True}),
+        (False, {"ok": False}),
     ]
-    assert list(map(itemgetter("result"), events["check:state:changed"])) == [
-        {
-            "data": {"ok": False},
-            "success": False,
-        }
+    results = list(map(itemgetter("result"), events["check:state:changed"]))
+    assert [(r["success"], r["data"]) for r in results] == [
+        (False, {"ok": False}),
     ]
 
 
+async def test_events_stream(cli, config):
+    config.EVENTS_KEEPALIVE_SECONDS = 0.01
+
+    stream = await cli.get("/events")
+    assert stream.status == 200
+    assert stream.headers["Content-Type"] == "text/event-stream"
+    assert await stream.content.readline() == b": keep-alive\n"
+    assert await stream.content.readline() == b"\n"
+
+    # Results of checks with overridden parameters are not pushed.
+    await cli.get("/checks/testproject/fake?max_age=42")
+    await cli.get("/checks/testproject/fake")
+
+    line = await stream.content.readline()
+    while line != b"event: check:run\n":
+        line = await stream.content.readline()
+    line = await stream.content.readline()
+    assert line.startswith(b"data: ")
+    pushed = json.loads(line[len("data: ") :])
+    assert pushed["project"] == "testproject"
+    assert pushed["name"] == "fake"
+    assert pushed["success"]
+    assert pushed["data"] == {"max_age": 999, "from_conf": 100}
+    assert pushed["age"] == 0
+
+    stream.close()
+
+
+async def test_events_stream_client_disconnected(cli, config):
+    config.EVENTS_KEEPALIVE_SECONDS = 0.01
+    broadcaster = cli.app["telescope.broadcaster"]
+
+    with mock.patch(
+        "telescope.app.web.StreamResponse.write", side_effect=ConnectionResetError
+    ) as mocked:
+        stream = await cli.get("/events")
+        await stream.read()
+
+    assert mocked.called
+    assert broadcaster.subscribers == []
+
+
+async def test_events_stream_drops_oldest_messages(cli):
+    broadcaster = cli.app["telescope.broadcaster"]
+    [check] = cli.app["telescope.checks"].lookup(project="testproject", name="fake")
+
+    with broadcaster.subscribe() as queue:
+        for i in range(broadcaster.QUEUE_MAX_SIZE + 1):
+            payload = {
+                "check": check,
+                "result": {
+                    "datetime": utcnow().isoformat(),
+                    "duration": 0.1,
+                    "success": True,
+                    "data": i,
+                },
+            }
+            broadcaster.publish("check:run", payload)
+
+        assert queue.qsize() == broadcaster.QUEUE_MAX_SIZE
+        assert json.loads(queue.get_nowait())["data"] == 1
+
+    assert broadcaster.subscribers == []
+
+
 async def test_logging_summary_no_querystring_by_default(caplog, cli):
     caplog.set_level(logging.INFO, logger="request.summary")
 
@@ -1,10 +1,21 @@
 import asyncio
+import itertools
 import os
 import subprocess
 import sys
+from datetime import timedelta
 from unittest import mock
 
-from telescope.app import Check, background_tasks, main, run_check
+from telescope.app import (
+    Check,
+    Checks,
+    background_tasks,
+    main,
+    refresh_check_periodically,
+    refresh_checks_periodically,
+    run_check,
+)
+from telescope.utils import WORK_QUEUE, InMemoryCache, utcnow
 
 
 async def test_run_check_cli(test_config_toml):
@@ -96,6 +107,162 @@ async def test_observe_event_loop(cli, config):
     assert pending_tasks_metric.labels("main")._value.get() >= 0
 
 
+async def test_background_tasks_with_scheduler(cli, config):
+    config.SCHEDULER_ENABLED = True
+    [check] = [c for c in cli.app["telescope.checks"].all if c.name == "fake"]
+    cache = cli.app["telescope.cache"]
+
+    # No initial delay.
+    with mock.patch("telescope.app.random.uniform", return_value=0):
+        gen = background_tasks(cli.app)
+        await gen.asend(None)
+        await asyncio.sleep(0.01)
+        try:
+            await gen.asend(None)
+        except StopAsyncIteration:
+            pass
+
+    result = await cache.get(check.cache_key)
+    assert result is not None
+    _, success, _, _ = result
+    assert success
+
+
+async def test_background_tasks_with_work_queue(cli):
+    with mock.patch.object(WORK_QUEUE, "client", mock.AsyncMock()):
+        with mock.patch.object(WORK_QUEUE, "work_forever") as mocked:
+            gen = background_tasks(cli.app)
+            await gen.asend(None)
+            await asyncio.sleep(0.01)
+            try:
+                await gen.asend(None)
+            except StopAsyncIteration:
+                pass
+
+    assert mocked.called
+
+
+async def test_refresh_checks_periodically():
+    check = Check(
+        project="a-project",
+        name="a-name",
+        description="Fake",
+        module="tests.conftest",
+        ttl=1,
+        params={"max_age": 1, "from_conf": 2},
+    )
+    cache = InMemoryCache()
+    events = mock.MagicMock()
+
+    task = asyncio.create_task(
+        refresh_checks_periodically(Checks([check]), cache, events)
+    )
+    await asyncio.sleep(0.2)
+    task.cancel()
+    await task
+
+    result = await cache.get(check.cache_key)
+    assert result is not None
+    _, success, data, _ = result
+    assert success
+    assert data == {"max_age": 1, "from_conf": 2}
+    events.emit.assert_called()
+
+
+async def test_refresh_check_periodically_skips_fresh_results():
+    def make_check():
+        return Check(
+            project="a-project",
+            name="a-name",
+            description="Fake",
+            module="tests.conftest",
+            ttl=10,
+            params={"max_age": 1, "from_conf": 2},
+        )
+
+    # Two instances sharing the same cache, eg. replicas with Redis.
+    checks = [make_check(), make_check()]
+    cache = InMemoryCache()
+    calls = []
+
+    async def fake_run(**kwargs):
+        calls.append(kwargs)
+        return True, {}
+
+    with mock.patch("telescope.app.random.uniform", return_value=0):
+        tasks = []
+        for check in checks:
+            check.func = fake_run
+            tasks.append(
+                asyncio.create_task(
+                    refresh_check_periodically(check, cache, None, jitter_ratio=0.5)
+                )
+            )
+        await asyncio.sleep(0.05)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert len(calls) == 1
+
+
+async def test_refresh_check_periodically_refreshes_outdated_results():
+    check = Check(
+        project="a-project",
+        name="a-name",
+        description="Fake",
+        module="tests.conftest",
+        ttl=10,
+        params={"max_age": 1, "from_conf": 2},
+    )
+    cache = InMemoryCache()
+    # Result stored by another instance, that is about to expire.
+    outdated = (
+        (utcnow() - timedelta(seconds=9)).isoformat(),
+        True,
+        {},
+        0.0,
+    )
+    await cache.set(check.cache_key, outdated, ttl=10)
+
+    with mock.patch("telescope.app.random.uniform", return_value=0):
+        task = asyncio.create_task(
+            refresh_check_periodically(check, cache, None, jitter_ratio=0.5)
+        )
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    result = await cache.get(check.cache_key)
+    assert result is not None
+    assert result != outdated
+    assert check.age(result) < 1
+
+
+async def test_refresh_checks_periodically_survives_errors():
+    check = Check(
+        project="a-project",
+        name="a-name",
+        description="Fake",
+        module="tests.conftest",
+        ttl=1,
+    )
+
+    with mock.patch.object(check, "run", side_effect=ValueError("boom")) as mocked:
+        # No initial delay, and a jitter of 100% of the TTL: the check is
+        # run continuously.
+        jitters = itertools.chain([0], itertools.repeat(1))
+        with mock.patch("telescope.app.random.uniform", side_effect=jitters):
+            task = asyncio.create_task(
+                refresh_checks_periodically(Checks([check]), None, None)
+            )
+            await asyncio.sleep(0.05)
+            task.cancel()
+            await task
+
+    assert mocked.call_count > 1
+
+
 def test_executing_from_command_line(test_config_toml):
     project = "testproject"
     check = "hb"
@@ -2,22 +2,36 @@ import asyncio
 import decimal
 import time
 from collections import namedtuple
+from datetime import timedelta
 from unittest import mock
 
 import aiohttp
 import pytest
+from aiohttp import web
 
 from telescope.utils import (
+    HTTP_CACHE,
+    REQUEST_COALESCER,
     BugTracker,
     ClientSession,
     History,
+    HostRequestScheduler,
+    HTTPCache,
     InMemoryCache,
     RedisCache,
+    TieredCache,
+    WorkQueue,
     extract_json,
     fetch_bigquery,
+    fetch_json,
+    fetch_sha256,
+    fetch_text,
+    json_dumps,
+    limit_request_concurrency,
     run_in_process_pool,
     run_parallel,
     sha256hex,
+    utcnow,
 )
 
 
@@ -34,20 +48,118 @@ async def test_cache_set_get():
 def mock_redis():
     with mock.patch("telescope.utils.Redis.from_url") as mocked:
 
+        class MockedPipeline:
+            def __init__(self, client):
+                self.client = client
+                self.commands = []
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *args):
+                pass
+
+            def __getattr__(self, name):
+                def queue(*args, **kwargs):
+                    self.commands.append((name, args, kwargs))
+                    return self
+
+                return queue
+
+            async def execute(self):
+                return [
+                    await getattr(self.client, name)(*args, **kwargs)
+                    for name, args, kwargs in self.commands
+                ]
+
+        class MockedPubSub:
+            def __init__(self, client):
+                self.client = client
+                self.queue = asyncio.Queue()
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *args):
+                self.client.subscribers.remove(self.queue)
+
+            async def subscribe(self, channel):
+                self.client.subscribers.append(self.queue)
+
+            async def listen(self):
+                yield {"type": "subscribe", "data": 1}
+                while True:
+                    yield {"type": "message", "data": await self.queue.get()}
+
         class MockedClient:
             def __init__(self):
                 self.store = {}
+                self.ttls = {}
                 self.locks = {}
+                self.subscribers = []
 
             async def get(self, key):
                 return self.store.get(key)
 
+            async def mget(self, keys):
+                return [self.store.get(key) for key in keys]
+
             async def set(self, key, value, ex=None):
                 self.store[key] = value
+                self.ttls[key] = ex if ex is not None else -1
+
+            async def ttl(self, key):
+                return self.ttls.get(key, -2)
 
             def lock(self, name, timeout=None, blocking_timeout=None):
                 return self.locks.setdefault(name, asyncio.Lock())
 
+            def pipeline(self, transaction=True):
+                return MockedPipeline(self)
+
+            async def publish(self, channel, message):
+                for queue in self.subscribers:
+                    queue.put_nowait(message.encode())
+
+            def pubsub(self):
+                return MockedPubSub(self)
+
+            async def expire(self, key, seconds):
+                self.ttls[key] = seconds
+
+            async def delete(self, *keys):
+                for key in keys:
+                    self.store.pop(key, None)
+
+            async def rpush(self, key, *values):
+                self.store.setdefault(key, []).extend(
+                    v if isinstance(v, bytes) else v.encode() for v in values
+                )
+
+            async def lpop(self, key):
+                values = self.store.get(key)
+                return values.pop(0) if values else None
+
+            async def sadd(self, key, *members):
+                self.store.setdefault(key, set()).update(m.encode() for m in members)
+
+            async def srem(self, key, *members):
+                self.store.get(key, set()).difference_update(
+                    m.encode() for m in members
+                )
+
+            async def smembers(self, key):
+                return set(self.store.get(key, set()))
+
+            async def hset(self, key, field, value):
+                self.store.setdefault(key, {})[field.encode()] = value.encode()
+
+            async def hlen(self, key):
+                return len(self.store.get(key, {}))
+
+            async def hgetall(self, key):
+                return dict(self.store.get(key, {}))
+
         mocked.return_value = MockedClient()
         yield mocked.return_value
 
@@ -63,8 +175,10 @@ async def test_redis_cache(mock_redis, value):
     assert result == value
 
 
-async def test_redis_cache_fail(mock_redis):
-    cache = RedisCache(url="redis://localhost:6379/0", key_prefix="test:")
+@pytest.mark.parametrize("codec", ["json", "orjson"])
+async def test_redis_cache_fail(mock_redis, codec):
+    pytest.importorskip(codec)
+    cache = RedisCache(url="redis://localhost:6379/0", key_prefix="test:", codec=codec)
     with pytest.raises(TypeError):
         await cache.set("key", object(), ttl=10)
 
@@ -86,6 +200,326 @@ async def test_redis_cache_lock(mock_redis):
         await asyncio.sleep(0.01)
 
 
+async def test_redis_cache_keeps_plain_json_payloads(mock_redis):
+    cache = RedisCache(url="redis://localhost:6379/0", key_prefix="test:")
+    await cache.set("key", {"v": 10}, ttl=10)
+
+    assert mock_redis.store[f"{cache._key('key')}:data"] == b'{"v": 10}'
+
+
+async def test_redis_cache_reads_legacy_json_payloads(mock_redis):
+    cache = RedisCache(
+        url="redis://localhost:6379/0", key_prefix="test:", compression="zlib"
+    )
+    mock_redis.store[f"{cache._key('key')}:data"] = b'{"v": 10}'
+
+    assert await cache.get("key") == {"v": 10}
+
+
+async def test_redis_cache_reads_decoded_responses(mock_redis):
+    cache = RedisCache(url="redis://localhost:6379/0", key_prefix="test:")
+    mock_redis.store[f"{cache._key('key')}:data"] = '{"v": 10}'
+
+    assert await cache.get("key") == {"v": 10}
+
+
+@pytest.mark.parametrize("codec", ["json", "orjson"])
+async def test_redis_cache_compresses_large_payloads(mock_redis, codec):
+    pytest.importorskip(codec)
+    cache = RedisCache(
+        url="redis://localhost:6379/0",
+        key_prefix="test:",
+        codec=codec,
+        compression="zlib",
+        compression_min_bytes=100,
+    )
+    cache.metric = mock.MagicMock()
+    small = {"v": decimal.Decimal("3.14")}
+    large = {"bad": ["x" * 10] * 100}
+    await cache.set("project/check-auth:secret", small, ttl=10)
+    await cache.set("scalar-history:project/check", large, ttl=10)
+
+    assert await cache.get("project/check-auth:secret") == {"v": "3.14"}
+    assert await cache.get("scalar-history:project/check") == large
+    stored = mock_redis.store[f"{cache._key('scalar-history:project/check')}:data"]
+    assert stored.startswith(b"\x00")
+    assert len(stored) < len(json_dumps(large))
+    cache.metric.labels.assert_has_calls(
+        [mock.call("project/check"), mock.call("scalar-history")], any_order=True
+    )
+
+
+async def test_redis_cache_ignores_unsupported_payloads(mock_redis):
+    cache = RedisCache(url="redis://localhost:6379/0", key_prefix="test:")
+    mock_redis.store[f"{cache._key('key')}:data"] = b"\x00j?data"
+    mock_redis.ttls[f"{cache._key('key')}:data"] = 10
+
+    assert await cache.get("key") is None
+    assert await cache.get_with_ttl("key") == (None, 0)
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{"codec": "pickle"}, {"compression": "lzma"}],
+    ids=["codec", "compression"],
+)
+def test_redis_cache_unsupported_configuration(mock_redis, kwargs):
+    with pytest.raises(ValueError):
+        RedisCache(url="redis://localhost:6379/0", key_prefix="test:", **kwargs)
+
+
+async def test_redis_cache_get_many_set_many(mock_redis):
+    cache = RedisCache(url="redis://localhost:6379/0", key_prefix="test:")
+    assert await cache.get_many([]) == []
+    await cache.set_many({"a": 1, "b": {"v": 2}}, ttl=10)
+
+    assert await cache.get_many(["a", "unknown", "b"]) == [1, None, {"v": 2}]
+    assert await cache.get_many_with_ttl(["b", "unknown"]) == [
+        ({"v": 2}, 10),
+        (None, 0),
+    ]
+
+
+async def test_inmemory_cache_get_many_set_many():
+    cache = InMemoryCache()
+    await cache.set_many({"a": 1, "b": 2}, ttl=10)
+
+    assert await cache.get_many(["a", "unknown", "b"]) == [1, None, 2]
+
+
+async def test_redis_cache_get_with_ttl(mock_redis):
+    cache = RedisCache(url="redis://localhost:6379/0", key_prefix="test:")
+    assert await cache.get_with_ttl("key") == (None, 0)
+    await cache.set("key", "value", ttl=10)
+    assert await cache.get_with_ttl("key") == ("value", 10)
+
+
+async def test_inmemory_cache_evicts_least_recently_used():
+    cache = InMemoryCache(max_entries=2)
+    await cache.set("a", 1, ttl=10)
+    await cache.set("b", 2, ttl=10)
+    await cache.get("a")
+    await cache.set("c", 3, ttl=10)
+
+    assert await cache.get("a") == 1
+    assert await cache.get("b") is None
+    assert await cache.get("c") == 3
+
+
+async def test_inmemory_cache_evicts_above_max_bytes():
+    cache = InMemoryCache(max_bytes=10)
+    cache.metric = mock.MagicMock()
+    await cache.set("a", "abc", ttl=10)
+    await cache.set("b", "def", ttl=10)
+    await cache.set("c", "ghi", ttl=10)
+
+    assert await cache.get("a") is None
+    assert await cache.get("b") == "def"
+    assert await cache.get("c") == "ghi"
+    assert cache._bytes == 10
+    cache.metric.labels.assert_called_with("bytes")
+
+
+async def test_inmemory_cache_sizeof_unserializable_values():
+    cache = InMemoryCache(max_bytes=1024 * 1024)
+    await cache.set("a", object(), ttl=10)
+
+    assert cache._bytes > 0
+
+
+async def test_inmemory_cache_does_not_estimate_size_when_unbounded():
+    cache = InMemoryCache()
+    with mock.patch.object(InMemoryCache, "_sizeof") as mocked:
+        await cache.set("a", "abc", ttl=10)
+
+    assert not mocked.called
+    assert cache._bytes == 0
+
+
+async def test_inmemory_cache_sweeps_expired_entries():
+    cache = InMemoryCache()
+    cache.metric = mock.MagicMock()
+    now = utcnow()
+    with mock.patch("telescope.utils.utcnow", return_value=now):
+        await cache.set("a", 1, ttl=1)
+        await cache.set("b", 2, ttl=60)
+        await cache.set("c", 3, ttl=60)
+        await cache.set("c", 4, ttl=2)
+    with mock.patch("telescope.utils.utcnow", return_value=now + timedelta(seconds=5)):
+        # Reading any key drops the expired ones.
+        assert await cache.get("b") == 2
+
+    assert list(cache._content.keys()) == ["b"]
+    cache.metric.labels("entries").set.assert_called_with(1)
+
+
+async def test_inmemory_cache_removes_evicted_keys_from_wheel():
+    cache = InMemoryCache(max_entries=1)
+    await cache.set("a", 1, ttl=60)
+    await cache.set("b", 2, ttl=60)
+    cache.delete("b")
+
+    assert cache._wheel == {}
+
+
+async def test_inmemory_cache_sweep_skips_entries_set_again():
+    cache = InMemoryCache()
+    now = utcnow()
+    with mock.patch("telescope.utils.utcnow", return_value=now):
+        await cache.set("a", 1, ttl=1)
+    with mock.patch("telescope.utils.utcnow", return_value=now + timedelta(seconds=1)):
+        await cache.set("a", 2, ttl=60)
+    with mock.patch("telescope.utils.utcnow", return_value=now + timedelta(seconds=5)):
+        assert await cache.get("a") == 2
+
+
+async def test_inmemory_cache_clear():
+    cache = InMemoryCache()
+    await cache.set("a", 1, ttl=10)
+    cache.clear()
+
+    assert await cache.get("a") is None
+    assert cache._bytes == 0
+
+
+async def test_inmemory_cache_forgets_unheld_locks():
+    cache = InMemoryCache()
+    events = []
+
+    async def locked(name):
+        async with cache.lock("key"):
+            events.append(name)
+            await asyncio.sleep(0)
+
+    await asyncio.gather(locked("a"), locked("b"))
+
+    assert events == ["a", "b"]
+    assert cache._locks == {}
+    assert cache._lock_users == {}
+
+
+async def test_tiered_cache(mock_redis):
+    cache = TieredCache(
+        RedisCache(url="redis://localhost:6379/0", key_prefix="test:"),
+        max_entries=10,
+        max_ttl=60,
+    )
+    cache.metric = mock.MagicMock()
+    assert await cache.get("key") is None
+    await cache.set("key", "value", ttl=10)
+
+    with mock.patch.object(mock_redis, "get") as mocked:
+        assert await cache.get("key") == "value"
+    assert not mocked.called
+
+    cache.l1.clear()
+    assert await cache.get("key") == "value"
+    assert await cache.l1.get(cache.l2._key("key")) == "value"
+
+    cache.metric.labels.assert_has_calls(
+        [
+            mock.call("l1", "miss"),
+            mock.call("l2", "miss"),
+            mock.call("l1", "hit"),
+            mock.call("l1", "miss"),
+            mock.call("l2", "hit"),
+        ],
+        any_order=True,
+    )
+    async with cache.lock("key"):
+        pass
+
+
+async def test_tiered_cache_get_many(mock_redis):
+    cache = TieredCache(
+        RedisCache(url="redis://localhost:6379/0", key_prefix="test:"),
+        max_entries=10,
+        max_ttl=60,
+    )
+    cache.metric = mock.MagicMock()
+    await cache.set_many({"a": 1, "b": 2}, ttl=10)
+    cache.l1.delete(cache.l2._key("b"))
+
+    with mock.patch.object(mock_redis, "get", wraps=mock_redis.get) as mocked:
+        assert await cache.get_many(["a", "b", "c"]) == [1, 2, None]
+        assert await cache.get_many(["a", "b"]) == [1, 2]
+
+    # Only the L1 misses were fetched from Redis.
+    assert mocked.call_count == 2
+    cache.metric.labels.assert_has_calls(
+        [mock.call("l1", "hit"), mock.call("l2", "hit"), mock.call("l2", "miss")],
+        any_order=True,
+    )
+
+
+async def test_tiered_cache_keeps_entries_without_expiration(mock_redis):
+    cache = TieredCache(
+        RedisCache(url="redis://localhost:6379/0", key_prefix="test:"),
+        max_entries=10,
+        max_ttl=60,
+    )
+    await mock_redis.set(f"{cache.l2._key('key')}:data", b'"value"')
+
+    assert await cache.get("key") == "value"
+    expires, _, _ = cache.l1._content[cache.l2._key("key")]
+    assert expires > utcnow() + timedelta(seconds=59)
+
+
+async def test_tiered_cache_invalidations(mock_redis):
+    cache_a, cache_b = [
+        TieredCache(
+            RedisCache(url="redis://localhost:6379/0", key_prefix="test:"),
+            max_entries=10,
+            max_ttl=60,
+        )
+        for _ in range(2)
+    ]
+    gen = cache_b.invalidation_context(web.Application())
+    await gen.asend(None)
+    await asyncio.sleep(0.01)
+
+    await cache_a.set("key", "value", ttl=10)
+    assert await cache_b.get("key") == "value"
+
+    await cache_a.set("key", "new value", ttl=10)
+    await cache_b.set("other", "value", ttl=10)
+    await asyncio.sleep(0.01)
+
+    assert await cache_b.get("key") == "new value"
+    assert await cache_b.l1.get(cache_b.l2._key("other")) == "value"
+
+    with pytest.raises(StopAsyncIteration):
+        await gen.asend(None)
+
+
+async def test_tiered_cache_invalidations_resubscribes_on_error(mock_redis):
+    cache = TieredCache(
+        RedisCache(url="redis://localhost:6379/0", key_prefix="test:"),
+        max_entries=10,
+        max_ttl=60,
+    )
+    await cache.set("key", "value", ttl=10)
+
+    delays = []
+    original_sleep = asyncio.sleep
+
+    async def fast_sleep(delay):
+        delays.append(delay)
+        await original_sleep(0)
+
+    with mock.patch.object(
+        mock_redis, "pubsub", side_effect=[ConnectionError("boom"), mock_redis.pubsub()]
+    ):
+        with mock.patch("asyncio.sleep", side_effect=fast_sleep):
+            task = asyncio.create_task(cache.listen_invalidations())
+            for _ in range(3):
+                await asyncio.sleep(0)
+            task.cancel()
+
+    assert 1 in delays
+    assert await cache.l1.get(cache.l2._key("key")) is None
+
+
 async def test_clientsession_checks_open():
     async with ClientSession() as session:
         await session.close()
@@ -95,6 +529,284 @@ async def test_clientsession_checks_open():
             pass
 
 
+async def test_fetch_identical_requests_are_coalesced(mock_aioresponses):
+    url = "http://fake.local/__version__"
+    mock_aioresponses.get(url, payload={"version": "1.0"}, repeat=True)
+    REQUEST_COALESCER.metric = mock.MagicMock()
+
+    results = await asyncio.gather(
+        fetch_json(url, headers={"Authorization": "Bearer abc"}),
+        fetch_json(url, headers={"Authorization": "Bearer abc"}),
+        fetch_json(url, headers={"Authorization": "Bearer def"}),
+    )
+    alone = await fetch_json(url)
+
+    assert results[0] == results[1] == results[2] == alone == {"version": "1.0"}
+    assert results[0] is not results[1]
+    [(_, requests)] = mock_aioresponses.requests.items()
+    assert len(requests) == 3
+    REQUEST_COALESCER.metric.labels.assert_called_once_with("fetch_json")
+    REQUEST_COALESCER.metric = None
+
+
+async def test_fetch_coalesced_requests_errors(mock_aioresponses, no_sleep):
+    url = "http://fake.local/__heartbeat__"
+    mock_aioresponses.get(url, status=503, repeat=True)
+
+    results = await asyncio.gather(
+        fetch_text(url, raise_for_status=True),
+        fetch_text(url, raise_for_status=True),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(r, aiohttp.ClientResponseError) for r in results)
+    assert not REQUEST_COALESCER._inflight
+
+
+async def test_request_scheduler_serves_hosts_in_turn():
+    scheduler = HostRequestScheduler(limit=1)
+    scheduler.metric = mock.MagicMock()
+    scheduler.host_metric = mock.MagicMock()
+    served = []
+
+    async def request(host, name):
+        async with scheduler.slot(host):
+            served.append(name)
+
+    await scheduler.acquire("cdn")
+    tasks = [
+        asyncio.create_task(request(host, name))
+        for host, name in [("cdn", "cdn1"), ("cdn", "cdn2"), ("kinto", "kinto1")]
+    ]
+    await asyncio.sleep(0)
+    scheduler.release("cdn")
+    await asyncio.gather(*tasks)
+
+    assert served == ["cdn1", "kinto1", "cdn2"]
+    scheduler.host_metric.labels.assert_any_call("cdn", "queued")
+    assert scheduler.metric.inc.call_count == scheduler.metric.dec.call_count == 4
+
+
+async def test_request_scheduler_limits_per_host():
+    scheduler = HostRequestScheduler(limit=10, limit_per_host=1)
+    await scheduler.acquire("cdn")
+
+    waiting = asyncio.create_task(scheduler.acquire("cdn"))
+    await asyncio.sleep(0)
+    await asyncio.wait_for(scheduler.acquire("kinto"), timeout=1)
+    await scheduler.acquire()  # no host, only the global limit applies.
+
+    assert not waiting.done()
+    scheduler.release("cdn")
+    await waiting
+    assert scheduler._active == 3
+
+
+async def test_request_scheduler_cancelled_waiters():
+    scheduler = HostRequestScheduler(limit=1)
+    scheduler.host_metric = mock.MagicMock()
+    await scheduler.acquire("cdn")
+
+    queued = asyncio.create_task(scheduler.acquire("cdn"))
+    await asyncio.sleep(0)
+    queued.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await queued
+    assert not scheduler._waiters
+
+    granted = asyncio.create_task(scheduler.acquire("cdn"))
+    await asyncio.sleep(0)
+    scheduler.release("cdn")  # Hands the slot over...
+    granted.cancel()  # ...right before the waiter resumes.
+    with pytest.raises(asyncio.CancelledError):
+        await granted
+    assert scheduler._active == 0
+
+
+async def test_limit_request_concurrency_uses_url_host():
+    calls = []
+    with mock.patch("telescope.utils.REQUEST_LIMIT") as mocked:
+        mocked.slot.side_effect = lambda host: calls.append(host) or asyncio.Lock()
+
+        @limit_request_concurrency
+        async def fetch(url, **kwargs):
+            return url
+
+        await fetch("https://cdn.local:8443/file.zip")
+        await fetch(url="http://kinto.local/v1/")
+        await fetch(None)
+
+    assert calls == ["cdn.local:8443", "kinto.local", ""]
+
+
+@pytest.fixture
+def http_cache():
+    HTTP_CACHE.cache = InMemoryCache()
+    HTTP_CACHE.metric = mock.MagicMock()
+    yield HTTP_CACHE
+    HTTP_CACHE.cache = None
+    HTTP_CACHE.metric = None
+
+
+async def test_http_cache_serves_fresh_responses(mock_aioresponses, http_cache):
+    url = "http://fake.local/data.json"
+    mock_aioresponses.get(
+        url, payload={"a": 1}, headers={"Cache-Control": "public, max-age=60"}
+    )
+
+    first = await fetch_json(url)
+    first["a"] = 2
+    second = await fetch_json(url)
+
+    assert second == {"a": 1}
+    [(_, requests)] = mock_aioresponses.requests.items()
+    assert len(requests) == 1
+    http_cache.metric.labels.assert_called_with("hit")
+
+
+async def test_http_cache_hits_do_not_wait_for_request_slots(
+    mock_aioresponses, http_cache
+):
+    url = "http://fake.local/data.json"
+    mock_aioresponses.get(
+        url, payload={"a": 1}, headers={"Cache-Control": "max-age=60"}
+    )
+    await fetch_json(url)
+
+    with mock.patch("telescope.utils.REQUEST_LIMIT") as mocked:
+        assert await fetch_json(url) == {"a": 1}
+
+    assert not mocked.slot.called
+
+
+async def test_http_cache_serves_responses_stored_while_waiting(
+    mock_aioresponses, http_cache
+):
+    url = "http://fake.local/data.json"
+    mock_aioresponses.get(
+        url, payload={"a": 1}, headers={"Cache-Control": "max-age=60"}
+    )
+    await fetch_json(url)
+
+    # Eg. stored by another request, while this one was waiting for a slot.
+    async with aiohttp.ClientSession() as session:
+        value = await http_cache.get(session, url, "json", mock.AsyncMock())
+
+    assert value == {"a": 1}
+    [(_, requests)] = mock_aioresponses.requests.items()
+    assert len(requests) == 1
+
+
+async def test_http_cache_revalidates_with_etag(mock_aioresponses, http_cache):
+    url = "http://fake.local/cert.pem"
+    mock_aioresponses.get(url, body="abc", headers={"ETag": '"42"'})
+    mock_aioresponses.get(url, status=304, headers={"ETag": '"42"'})
+    mock_aioresponses.get(url, status=304, headers={"ETag": '"43"'})
+
+    assert await fetch_text(url) == "abc"
+    assert await fetch_text(url) == "abc"
+    assert await fetch_text(url) == "abc"
+
+    [(_, requests)] = mock_aioresponses.requests.items()
+    assert "If-None-Match" not in requests[0].kwargs["headers"]
+    assert requests[1].kwargs["headers"]["If-None-Match"] == '"42"'
+    assert requests[2].kwargs["headers"]["If-None-Match"] == '"42"'
+    http_cache.metric.labels.assert_called_with("revalidated")
+
+
+async def test_http_cache_revalidates_with_last_modified(mock_aioresponses, http_cache):
+    url = "http://fake.local/data.json"
+    last_modified = "Wed, 21 Oct 2015 07:28:00 GMT"
+    expires = "Wed, 21 Oct 2015 07:28:00 GMT"
+    mock_aioresponses.get(
+        url,
+        payload={"a": 1},
+        headers={"Last-Modified": last_modified, "Expires": expires},
+    )
+    mock_aioresponses.get(url, payload={"a": 2})
+
+    assert await fetch_json(url) == {"a": 1}
+    assert await fetch_json(url) == {"a": 2}
+
+    [(_, requests)] = mock_aioresponses.requests.items()
+    assert requests[1].kwargs["headers"]["If-Modified-Since"] == last_modified
+    http_cache.metric.labels.assert_called_with("miss")
+
+
+@pytest.mark.parametrize(
+    "headers,body",
+    [
+        ({"Cache-Control": "no-store"}, "abc"),
+        ({"Cache-Control": "max-age=60"}, "a" * 2048),
+        ({}, "abc"),
+    ],
+    ids=["no-store", "too-large", "not-reusable"],
+)
+async def test_http_cache_skips_responses(
+    mock_aioresponses, http_cache, config, headers, body
+):
+    http_cache.max_body_size = 1024
+    url = "http://fake.local/data.txt"
+    mock_aioresponses.get(url, body=body, headers=headers, repeat=True)
+
+    await fetch_text(url)
+    await fetch_text(url)
+
+    http_cache.max_body_size = config.HTTP_CACHE_MAX_BODY_SIZE
+    [(_, requests)] = mock_aioresponses.requests.items()
+    assert len(requests) == 2
+    assert http_cache.cache._content == {}
+
+
+async def test_http_cache_bypassed_with_no_store_requests(
+    mock_aioresponses, http_cache
+):
+    url = "http://fake.local/data.json"
+    mock_aioresponses.get(
+        url, payload={"a": 1}, headers={"Cache-Control": "max-age=60"}, repeat=True
+    )
+
+    await fetch_json(url, headers={"Cache-Control": "no-store"})
+    await fetch_json(url, headers={"Cache-Control": "no-store"})
+
+    [(_, requests)] = mock_aioresponses.requests.items()
+    assert len(requests) == 2
+    assert http_cache.cache._content == {}
+
+
+@pytest.mark.parametrize(
+    "headers,expected",
+    [
+        ({}, 0),
+        ({"Cache-Control": "no-cache, max-age=60"}, 0),
+        ({"Cache-Control": 'max-age="60"'}, 60),
+        ({"Cache-Control": "max-age=abc"}, 0),
+        ({"Expires": "Wed, 21 Oct 2015 07:28:00 GMT"}, 0),
+        ({"Expires": "0"}, 0),
+        ({"Cache-Control": "no-store"}, None),
+    ],
+)
+def test_http_cache_freshness(headers, expected):
+    assert HTTPCache.freshness(headers) == expected
+
+
+def test_http_cache_freshness_from_expires():
+    expires = (utcnow() + timedelta(seconds=120)).strftime("%a, %d %b %Y %H:%M:%S GMT")
+
+    freshness = HTTPCache.freshness({"Expires": expires})
+    assert freshness is not None
+    assert 100 < freshness <= 120
+
+
+async def test_fetch_sha256(mock_aioresponses):
+    url = "http://fake.local/file.bin"
+    mock_aioresponses.get(url, body=b"a" * 10, repeat=True)
+
+    with mock.patch("telescope.utils.STREAM_CHUNK_SIZE", 3):
+        assert await fetch_sha256(url) == (10, sha256hex(b"a" * 10))
+        assert await fetch_sha256(url, max_size=4) == (6, None)
+
+
 async def test_fetch_bigquery(mock_aioresponses):
     with mock.patch("telescope.utils.bigquery.Client") as mocked:
         mocked.return_value.project = "wip"
@@ -194,6 +906,105 @@ def test_extract_json():
     assert "string indices must be integers" in str(exc_info.value)
 
 
+async def double(items, factor=2):
+    await asyncio.sleep(0)
+    return [item * factor for item in items]
+
+
+async def test_work_queue_runs_locally_without_redis():
+    queue = WorkQueue()
+    queue.task(double)
+
+    assert await queue.map(double, [1, 2, 3], factor=3) == [3, 6, 9]
+
+
+async def test_work_queue_shares_batches_between_replicas(mock_redis):
+    coordinator = WorkQueue(batch_size=2, poll_interval=0)
+    replica = WorkQueue(batch_size=2, poll_interval=0)
+    processed_by_replica = []
+
+    @replica.task
+    @coordinator.task
+    async def triple(items, factor=1):
+        if asyncio.current_task() is worker:
+            processed_by_replica.extend(items)
+        return await double(items, factor=factor)
+
+    for queue in (coordinator, replica):
+        queue.connect("redis://localhost:6379/0", key_prefix="test")
+    worker = asyncio.create_task(replica.work_forever())
+
+    results = await coordinator.map(triple, list(range(10)), factor=3)
+    worker.cancel()
+    await worker
+
+    assert results == [i * 3 for i in range(10)]
+    assert processed_by_replica
+    assert mock_redis.store["test:work:jobs"] == set()
+    assert set(mock_redis.store) == {"test:work:jobs"}
+
+
+async def test_work_queue_runs_lost_batches_locally(mock_redis):
+    queue = WorkQueue(batch_size=1, timeout=0.01, poll_interval=0)
+    queue.connect("redis://localhost:6379/0", key_prefix="test")
+    queue.task(double)
+
+    # Batches are claimed by replicas that never complete them.
+    with mock.patch.object(queue, "_work_on", return_value=False):
+        results = await queue.map(double, [1, 2])
+
+    assert results == [2, 4]
+
+
+async def test_work_queue_gives_failed_batches_back(mock_redis):
+    queue = WorkQueue(poll_interval=0)
+    queue.connect("redis://localhost:6379/0", key_prefix="test")
+    calls = []
+
+    @queue.task
+    async def fail(items):
+        calls.append(items)
+        raise ValueError("boom")
+
+    with mock.patch.object(mock_redis, "rpush", wraps=mock_redis.rpush) as rpush:
+        with pytest.raises(ValueError):
+            await queue.map(fail, [1, 2])
+
+    assert calls == [[1, 2]]
+    # Initial batches, then the failed one.
+    assert rpush.call_count == 2
+    assert set(mock_redis.store) == {"test:work:jobs"}
+
+
+async def test_work_queue_worker_skips_unknown_jobs(mock_redis, caplog):
+    queue = WorkQueue(poll_interval=0)
+    queue.connect("redis://localhost:6379/0", key_prefix="test")
+    await mock_redis.sadd("test:work:jobs", "expired", "unknown")
+    await mock_redis.set("test:work:unknown:spec", '{"task": "a.b", "params": {}}')
+
+    smembers = mock_redis.smembers
+    failures = [ConnectionError("boom")]
+
+    async def flaky_smembers(key):
+        if failures:
+            raise failures.pop()
+        return await smembers(key)
+
+    with mock.patch.object(mock_redis, "smembers", side_effect=flaky_smembers):
+        worker = asyncio.create_task(queue.work_forever())
+        for _ in range(5):
+            await asyncio.sleep(0)
+        worker.cancel()
+        await worker
+
+    assert mock_redis.store["test:work:jobs"] == {b"unknown"}
+    assert "boom" in caplog.text
+
+
+async def test_work_queue_worker_without_redis():
+    await WorkQueue().work_forever()
+
+
 def test_sha256hex():
     assert sha256hex(b"Hello, world!").startswith("315f5")
 
@@ -442,6 +1253,62 @@ async def test_bugzilla_fetch_with_empty_cache(mock_aioresponses, config):
     assert len(results) == 1
 
 
+async def test_bugzilla_fetch_uses_index_until_expired(mock_aioresponses, config):
+    config.BUGTRACKER_URL = "https://bugzilla.mozilla.org"
+    cache = InMemoryCache()
+    tracker = BugTracker(cache=cache)
+    await cache.set(
+        "bugtracker-list",
+        {
+            "bugs": [
+                {
+                    "id": 111,
+                    "summary": "bug",
+                    "last_change_time": "2020-06-04T22:54:59Z",
+                    "product": "Firefox",
+                    "is_open": True,
+                    "status": "RESOLVED",
+                    "groups": [],
+                    "whiteboard": "telemetry/pipeline other/check",
+                }
+            ]
+        },
+        ttl=1000,
+    )
+
+    with mock.patch.object(cache, "get", wraps=cache.get) as mocked:
+        results = await tracker.fetch(project="telemetry", name="pipeline")
+        results_other = await tracker.fetch(project="other", name="check")
+        results_again = await tracker.fetch(project="telemetry", name="pipeline")
+
+    assert mocked.call_count == 1
+    assert [r["id"] for r in results] == [111]
+    assert [r["id"] for r in results_other] == [111]
+    assert results_again == results
+
+    config.BUGTRACKER_TTL = 0
+    with mock.patch.object(cache, "get", wraps=cache.get) as mocked:
+        tracker._index_expires = 0
+        await tracker.fetch(project="telemetry", name="pipeline")
+    assert mocked.call_count == 1
+
+
+async def test_bugzilla_fetch_refreshes_once_when_concurrent(mock_aioresponses, config):
+    config.BUGTRACKER_URL = "https://bugzilla.mozilla.org"
+    mock_aioresponses.get(
+        config.BUGTRACKER_URL + "/rest/bug?whiteboard=telescope ",
+        payload={"bugs": []},
+    )
+    tracker = BugTracker(cache=InMemoryCache())
+
+    results = await asyncio.gather(
+        tracker.fetch(project="telemetry", name="pipeline"),
+        tracker.fetch(project="other", name="check"),
+    )
+
+    assert results == [[], []]
+
+
 @pytest.fixture
 def mock_bigquery_client():
     with mock.patch("telescope.utils.bigquery.Client") as mocked:
@@ -510,16 +1377,14 @@ async def test_history_return_results_from_cache(config):
     cache = InMemoryCache()
     history = History(cache=cache)
     await cache.set(
-        "scalar-history",
-        {
-            "crlite/filter-age": [
-                {
-                    "scalar": 42.0,
-                    "success": False,
-                    "t": "2020-10-18 08:51:50",
-                },
-            ]
-        },
+        "scalar-history:crlite/filter-age",
+        [
+            {
+                "scalar": 42.0,
+                "success": False,
+                "t": "2020-10-18 08:51:50",
+            },
+        ],
         ttl=1000,
     )
 
@@ -536,18 +1401,17 @@ async def test_history_fetch_with_expired_cache(config):
     cache = InMemoryCache()
     history = History(cache=cache)
     await cache.set(
-        "scalar-history",
-        {
-            "crlite/filter-age": [
-                {
-                    "scalar": 42.0,
-                    "success": False,
-                    "t": "2020-10-18 08:51:50",
-                },
-            ]
-        },
+        "scalar-history:crlite/filter-age",
+        [
+            {
+                "scalar": 42.0,
+                "success": False,
+                "t": "2020-10-18 08:51:50",
+            },
+        ],
         ttl=0,
     )
+    await cache.set("scalar-history", True, ttl=0)
 
     with mock.patch(
         "telescope.utils.fetch_bigquery",
@@ -561,6 +1425,78 @@ async def test_history_fetch_with_expired_cache(config):
     assert len(results) == 1
 
 
+async def test_history_is_stored_per_check(config):
+    config.HISTORY_DAYS = 1
+
+    cache = InMemoryCache()
+    history = History(cache=cache)
+    with mock.patch(
+        "telescope.utils.fetch_bigquery",
+        return_value=[
+            Row("crlite/filter-age", "2020-10-16 08:51:50", True, 32.0),
+            Row("telemetry/pipeline", "2020-10-15 08:51:50", False, 12.0),
+        ],
+    ) as mocked:
+        results = await history.fetch(project="crlite", name="filter-age")
+        other_results = await history.fetch(project="telemetry", name="pipeline")
+        no_results = await history.fetch(project="telemetry", name="unknown")
+
+    assert mocked.call_count == 1
+    assert results == [{"t": "2020-10-16 08:51:50", "success": True, "scalar": 32.0}]
+    assert other_results == [
+        {"t": "2020-10-15 08:51:50", "success": False, "scalar": 12.0}
+    ]
+    assert no_results == []
+    assert await cache.get("scalar-history:telemetry/pipeline") == other_results
+
+
+async def test_history_fetch_many_reads_cache_at_once(config):
+    config.HISTORY_DAYS = 1
+
+    cache = InMemoryCache()
+    history = History(cache=cache)
+    entries = [{"t": "2020-10-16 08:51:50", "success": True, "scalar": 32.0}]
+    await cache.set("scalar-history:crlite/filter-age", entries, ttl=1000)
+    await cache.set("scalar-history", True, ttl=1000)
+
+    with mock.patch.object(cache, "get_many", wraps=cache.get_many) as mocked:
+        results = await history.fetch_many(
+            [("crlite", "filter-age"), ("telemetry", "unknown")]
+        )
+
+    assert results == [entries, []]
+    mocked.assert_called_once()
+
+
+async def test_history_is_fetched_once_concurrently(config):
+    config.HISTORY_DAYS = 1
+
+    history = History(cache=InMemoryCache())
+
+    async def slow_fetch(query):
+        await asyncio.sleep(0)
+        return [Row("crlite/filter-age", "2020-10-16 08:51:50", True, 32.0)]
+
+    with mock.patch("telescope.utils.fetch_bigquery", side_effect=slow_fetch) as mocked:
+        results = await asyncio.gather(
+            history.fetch(project="crlite", name="filter-age"),
+            history.fetch(project="crlite", name="filter-age"),
+        )
+
+    assert mocked.call_count == 1
+    assert results[0] == results[1]
+
+
+async def test_history_fetch_many_returns_none_on_error(config):
+    config.HISTORY_DAYS = 1
+
+    history = History()
+    with mock.patch("telescope.utils.fetch_bigquery", side_effect=ValueError):
+        results = await history.fetch_many([("crlite", "filter-age"), ("a", "b")])
+
+    assert results == [None, None]
+
+
 async def test_history_fetch_with_empty_cache(config):
     config.HISTORY_DAYS = 1
 